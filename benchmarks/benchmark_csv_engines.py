@@ -0,0 +1,66 @@
+"""
+Compares reading a synthetic statement of funds with the C engine and the pyarrow engine of flex_query. Each
+transaction has a line in base currency and a line in original currency (USD), both with all columns of a Flex Query.
+Amounts, FX rates and dates vary from line to line like in a real statement.
+
+Usage: PYTHONPATH=src python benchmarks/benchmark_csv_engines.py
+"""
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from flex_query import FlexQueryFileIndex, read_statement_of_funds
+
+TRANSACTIONS = [50_000, 200_000]
+ENGINES = ["c", "pyarrow"]
+HEADER = ('"HEADER","STFU","Model","CurrencyPrimary","FXRateToBase","AssetClass","SubCategory","Symbol",'
+          '"Description","Conid","Strike","Expiry","Put/Call","ReportDate","Date","ActivityCode",'
+          '"ActivityDescription","TradeID","OrderID","Buy/Sell","TradeQuantity","TradePrice","TradeGross",'
+          '"TradeCommission","TradeTax","Amount","LevelOfDetail","TransactionID","ActionID"\n')
+DATA = ('"DATA","STFU","","{currency}","{fx_rate}","OPT","","BAC   220318P00044000","BAC 18MAR22 44.0 P",'
+        '"516104549","44","20220318","P","{date}","{date}","SELL","Sell -1 BAC 18MAR22 44.0 P ","{0}","{0}",'
+        '"SELL","-1","0.52","52","-2","0","{amount}","{level_of_detail}","{0}",""\n')
+
+
+def write_statement_of_funds(filename: str, transactions: int):
+    random_numbers = random.Random(42)
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(HEADER)
+        for transaction_id in range(transactions):
+            date = f"{2020 + transaction_id * 5 // transactions}{random_numbers.randint(1, 12):02}" \
+                   f"{random_numbers.randint(1, 28):02}"
+            fx_rate = random_numbers.uniform(0.8, 1.0)
+            amount = random_numbers.uniform(-5000, 5000)
+            file.write(DATA.format(transaction_id, currency="EUR", fx_rate="1", date=date,
+                                   amount=f"{amount * fx_rate:.6f}".rstrip("0"), level_of_detail="BaseCurrency"))
+            file.write(DATA.format(transaction_id, currency="USD", fx_rate=f"{fx_rate:.5f}", date=date,
+                                   amount=f"{amount:.2f}", level_of_detail="Currency"))
+
+
+def measure(filename: str, engine: str) -> tuple[float, float]:
+    with FlexQueryFileIndex.from_file(filename) as sections:
+        tracemalloc.start()
+        start = time.perf_counter()
+        df = read_statement_of_funds(filename, sections, engine=engine)
+        duration = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    del df
+    return duration, peak / 2 ** 20
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for transactions in TRANSACTIONS:
+            filename = os.path.join(directory, f"stfu_{transactions}.csv")
+            write_statement_of_funds(filename, transactions)
+            print(f"{transactions:,} transactions ({os.path.getsize(filename) / 2 ** 20:.0f} MiB)")
+            for engine in ENGINES:
+                duration, peak = measure(filename, engine)
+                print(f"{engine:>8}: {duration:.2f} s, peak {peak:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
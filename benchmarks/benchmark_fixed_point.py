@@ -0,0 +1,75 @@
+"""
+Compares reading a synthetic statement of funds with Decimal money columns and with fixed point money columns, the
+latter including the conversion back to Decimal before the lines reach Report. Amounts, FX rates and dates vary from
+line to line like in a real statement, and every tenth transaction is a forex trade with a commission.
+
+Usage: PYTHONPATH=src python benchmarks/benchmark_fixed_point.py
+"""
+import os
+import random
+import tempfile
+import time
+
+from fixed_point import convert_fixed_point_to_decimals
+from flex_query import FlexQueryFileIndex, read_statement_of_funds
+
+TRANSACTIONS = [100_000]
+HEADER = ('"HEADER","STFU","Model","CurrencyPrimary","FXRateToBase","AssetClass","SubCategory","Symbol",'
+          '"Description","Conid","Strike","Expiry","Put/Call","ReportDate","Date","ActivityCode",'
+          '"ActivityDescription","TradeID","OrderID","Buy/Sell","TradeQuantity","TradePrice","TradeGross",'
+          '"TradeCommission","TradeTax","Amount","LevelOfDetail","TransactionID","ActionID"\n')
+DATA = ('"DATA","STFU","","{currency}","{fx_rate}","{asset_class}","","{symbol}","{symbol}","{conid}","","","",'
+        '"{date}","{date}","{code}","{code} {symbol}","{trade_id}","{trade_id}","{buy_sell}","{quantity}",'
+        '"{price}","{gross}","{commission}","0","{amount}","{level_of_detail}","{transaction_id}",""\n')
+
+
+def write_statement_of_funds(filename: str, transactions: int):
+    random_numbers = random.Random(42)
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(HEADER)
+        for transaction in range(transactions):
+            date = f"{2020 + transaction * 5 // transactions}{random_numbers.randint(1, 12):02}" \
+                   f"{random_numbers.randint(1, 28):02}"
+            fx_rate = f"{random_numbers.uniform(0.8, 1.0):.5f}"
+            is_forex = transaction % 10 == 0
+            quantity = random_numbers.randint(-500, 500) or 1
+            price = f"{random_numbers.uniform(1, 500):.2f}"
+            gross = f"{-quantity * float(price):.2f}"
+            commission = f"{-random_numbers.uniform(0.3, 2):.9f}"
+            amount = f"{float(gross) + float(commission):.9f}".rstrip("0").rstrip(".")
+            common = dict(asset_class="CASH" if is_forex else "STK", symbol="EUR.USD" if is_forex else "BAC",
+                          conid="12087792" if is_forex else "10098", date=date,
+                          code="FOREX" if is_forex else ("BUY" if quantity > 0 else "SELL"),
+                          trade_id=transaction, buy_sell="BUY" if quantity > 0 else "SELL", quantity=quantity,
+                          price=price, gross=gross, transaction_id=transaction)
+            base_amount = f"{float(amount) * float(fx_rate):.9f}".rstrip("0").rstrip(".")
+            file.write(DATA.format(currency="EUR", fx_rate="1", commission=commission, amount=base_amount,
+                                   level_of_detail="BaseCurrency", **common))
+            file.write(DATA.format(currency="USD", fx_rate=fx_rate, commission=commission, amount=amount,
+                                   level_of_detail="Currency", **common))
+            if is_forex:
+                # Commission of a forex trade, charged in base currency
+                file.write(DATA.format(currency="EUR", fx_rate="1", commission=commission, amount=commission,
+                                       level_of_detail="Currency", **common))
+
+
+def measure(filename: str, fixed_point: bool) -> float:
+    with FlexQueryFileIndex.from_file(filename) as sections:
+        start = time.perf_counter()
+        df = read_statement_of_funds(filename, sections, fixed_point)
+        convert_fixed_point_to_decimals(df)
+        return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for transactions in TRANSACTIONS:
+            filename = os.path.join(directory, f"stfu_{transactions}.csv")
+            write_statement_of_funds(filename, transactions)
+            print(f"{transactions:,} transactions ({os.path.getsize(filename) / 2 ** 20:.0f} MiB)")
+            for fixed_point in [False, True]:
+                print(f"{'fixed point' if fixed_point else 'Decimal':>11}: {measure(filename, fixed_point):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the buffered IterableTextIO with the previous line-per-read implementation by parsing a synthetic statement
+of funds section with 1,000,000 lines. Parsing the joined section from a StringIO is shown as reference.
+
+Usage: PYTHONPATH=src python benchmarks/benchmark_iterable_text_io.py
+"""
+import io
+import time
+
+import pandas as pd
+
+from flex_query import STATEMENT_OF_FUNDS_COLUMNS
+from iterable_text_io import IterableTextIO
+
+LINES = 1_000_000
+HEADER = ('"HEADER","STFU","Model","CurrencyPrimary","FXRateToBase","AssetClass","SubCategory","Symbol",'
+          '"Description","Conid","Strike","Expiry","Put/Call","ReportDate","Date","ActivityCode",'
+          '"ActivityDescription","TradeID","OrderID","Buy/Sell","TradeQuantity","TradePrice","TradeGross",'
+          '"TradeCommission","TradeTax","Amount","LevelOfDetail","TransactionID","ActionID"\n')
+DATA = ('"DATA","STFU","","USD","0.874","OPT","","BAC   220318P00044000","BAC 18MAR22 44.0 P","516104549","44",'
+        '"20220318","P","20220207","20220207","SELL","Sell -1 BAC 18MAR22 44.0 P ","{0}","{0}","SELL","-1",'
+        '"0.52","52","-2","0","50","Currency","{0}",""\n')
+
+
+class LinePerReadTextIO(io.TextIOBase):
+    """
+    The previous implementation of IterableTextIO, returning at most one string per read.
+    """
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.leftover = None
+
+    def read(self, size: int = -1) -> str:
+        try:
+            chunk = self.leftover or next(self.iterable)
+            output, self.leftover = chunk[:size], chunk[size:]
+            return output
+        except StopIteration:
+            return ""
+
+
+def section_lines() -> list[str]:
+    return [HEADER] + [DATA.format(line_no) for line_no in range(LINES)]
+
+
+def parse(text_io_class, lines: list[str]) -> float:
+    start = time.perf_counter()
+    df = pd.read_csv(text_io_class(iter(lines)),
+                     usecols=STATEMENT_OF_FUNDS_COLUMNS[:-1],
+                     dtype=str)
+    duration = time.perf_counter() - start
+    assert len(df) == LINES
+    return duration
+
+
+def main():
+    lines = section_lines()
+    line_per_read = parse(LinePerReadTextIO, lines)
+    buffered = parse(IterableTextIO, lines)
+    native = parse(lambda iterator: io.StringIO("".join(iterator)), lines)
+    print(f"{LINES:,} lines")
+    print(f"line per read: {line_per_read:.2f} s")
+    print(f"buffered:      {buffered:.2f} s ({line_per_read / buffered:.1f}x)")
+    print(f"StringIO:      {native:.2f} s (reference, whole section as one string)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures the memory the transaction pairs of a position keep per transaction, once for lots which are closed as a
+whole and once for lots which are split across closing transactions. The transactions themselves are kept in a
+TransactionTable like in DepotPosition and are not counted.
+
+Usage: PYTHONPATH=src python benchmarks/benchmark_pair_memory.py
+"""
+import datetime
+import gc
+import tracemalloc
+from decimal import Decimal
+
+from Asset import Asset
+from money import Money
+from transaction import Transaction, BuySell, OpenCloseIndicator
+from transaction_collection import FifoMatcher
+from transaction_table import TransactionTable
+
+TRANSACTIONS = 100_000
+ASSET = Asset("BAC", "15124833", "STK", "COMMON")
+# Quantities of the transactions, repeated: whole lots are bought and sold as they are, split lots are sold in parts
+PATTERNS = {"whole lots": [10, -10], "split lots": [3, -2, 3, -4]}
+
+
+def transaction(transaction_id: int, quantity: int) -> Transaction:
+    is_buy = quantity > 0
+    return Transaction(str(transaction_id),
+                       datetime.date(2020, 1, 1) + datetime.timedelta(days=transaction_id // 50),
+                       ASSET,
+                       f"{'Buy' if is_buy else 'Sell'} {abs(quantity)} BANK OF AMERICA CORP",
+                       BuySell.BUY if is_buy else BuySell.SELL,
+                       OpenCloseIndicator.OPEN if is_buy else OpenCloseIndicator.CLOSE,
+                       Decimal(quantity),
+                       Money(Decimal(-quantity * 30) + Decimal("0.25"), "EUR"),
+                       Money(Decimal(-quantity * 33), "USD"),
+                       Decimal("0.9"))
+
+
+def measure(quantities: list[int]) -> float:
+    table = TransactionTable(transaction(transaction_id, quantities[transaction_id % len(quantities)])
+                             for transaction_id in range(TRANSACTIONS))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    matcher = FifoMatcher()
+    transaction_pairs = matcher.match(table)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del transaction_pairs, matcher
+    return (after - before) / TRANSACTIONS
+
+
+def main():
+    for name, quantities in PATTERNS.items():
+        print(f"{name}: {measure(quantities):.0f} bytes per transaction")
+
+
+if __name__ == "__main__":
+    main()
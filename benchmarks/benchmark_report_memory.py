@@ -0,0 +1,82 @@
+"""
+Measures the memory a Report keeps per ingested line of a synthetic statement of funds. The lines are dividends,
+withholding taxes, interest and fees in USD, so each line becomes a record like Dividend and a flow of the USD
+account, i.e. a Transaction with two Money objects.
+
+The memory is measured after ingesting the lines, and again after the foreign currency page has been computed,
+which keeps the transaction pairs of the USD account.
+
+Usage: PYTHONPATH=src python benchmarks/benchmark_report_memory.py
+"""
+import gc
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from fixed_point import convert_fixed_point_to_decimals
+from flex_query import FlexQueryFileIndex, read_statement_of_funds
+from report import Report
+
+TRANSACTIONS = [20_000, 100_000]
+ACTIVITIES = [("DIV", "BAC(US0605051046) Cash Dividend USD 0.24 per Share (Ordinary Dividend)", "24", "20.98"),
+              ("FRTAX", "BAC(US0605051046) Cash Dividend USD 0.24 per Share - US Tax", "-3.6", "-3.15"),
+              ("DINT", "USD Debit Interest for Jan-2024", "-1.23", "-1.08"),
+              ("OFEE", "Monthly Minimum Fee for Jan 2024", "-10", "-8.74")]
+HEADER = ('"HEADER","STFU","Model","CurrencyPrimary","FXRateToBase","AssetClass","SubCategory","Symbol",'
+          '"Description","Conid","Strike","Expiry","Put/Call","ReportDate","Date","ActivityCode",'
+          '"ActivityDescription","TradeID","OrderID","Buy/Sell","TradeQuantity","TradePrice","TradeGross",'
+          '"TradeCommission","TradeTax","Amount","LevelOfDetail","TransactionID","ActionID"\n')
+DATA = ('"DATA","STFU","","{currency}","{fx_rate}","STK","COMMON","BAC","BANK OF AMERICA CORP","15124833","","",'
+        '"","{date}","{date}","{code}","{description}","","","","0","0","0","0","0","{amount}",'
+        '"{level_of_detail}","{0}","{action_id}"\n')
+
+
+def write_statement_of_funds(filename: str, transactions: int):
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(HEADER)
+        for transaction_id in range(transactions):
+            code, description, amount, base_amount = ACTIVITIES[transaction_id % len(ACTIVITIES)]
+            date = f"2024{transaction_id % 12 + 1:02}{transaction_id % 28 + 1:02}"
+            action_id = transaction_id // len(ACTIVITIES)
+            file.write(DATA.format(transaction_id, currency="EUR", fx_rate="1", date=date, code=code,
+                                   description=description, amount=base_amount, level_of_detail="BaseCurrency",
+                                   action_id=action_id))
+            file.write(DATA.format(transaction_id, currency="USD", fx_rate="0.874", date=date, code=code,
+                                   description=description, amount=amount, level_of_detail="Currency",
+                                   action_id=action_id))
+
+
+def measure(filename: str) -> tuple[int, float, float]:
+    with FlexQueryFileIndex.from_file(filename) as sections:
+        df = read_statement_of_funds(filename, sections)
+    df["Open/CloseIndicator"] = np.nan
+    convert_fixed_point_to_decimals(df)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    report = Report()
+    report.ingest_statements(df)
+    gc.collect()
+    after_ingest = tracemalloc.get_traced_memory()[0]
+    report.get_foreign_currencies(2024, False)
+    gc.collect()
+    after_matching = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del report
+    return len(df), (after_ingest - before) / len(df), (after_matching - before) / len(df)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for transactions in TRANSACTIONS:
+            filename = os.path.join(directory, f"stfu_{transactions}.csv")
+            write_statement_of_funds(filename, transactions)
+            lines, bytes_after_ingest, bytes_after_matching = measure(filename)
+            print(f"{lines:,} lines: {bytes_after_ingest:.0f} bytes per line after ingesting, "
+                  f"{bytes_after_matching:.0f} bytes per line with transaction pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import io
+from typing import Iterable
+
+
+class ByteRangesIO(io.RawIOBase):
+    """
+    Makes a sequence of byte ranges, e.g. slices of a memory-mapped file, readable like a single binary file.
+
+    Usage:
+    with io.BufferedReader(ByteRangesIO([memoryview(buffer)[10:20], memoryview(buffer)[30:40]])) as f:
+        df = pd.read_csv(f)
+
+    The ranges are not copied; each read copies bytes straight from the ranges into the caller's buffer.
+    """
+    def __init__(self, ranges: Iterable[memoryview]):
+        """
+        Creates a new instance which allows reading the given byte ranges one after another.
+
+        :param ranges: Byte ranges, read in the given order
+        """
+        self.ranges = [memoryview(byte_range).cast("B") for byte_range in ranges]
+        self.ranges.reverse()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast("B")
+        size = 0
+        while self.ranges and size < len(target):
+            byte_range = self.ranges[-1]
+            chunk_size = min(len(byte_range), len(target) - size)
+            target[size:size + chunk_size] = byte_range[:chunk_size]
+            size += chunk_size
+            if chunk_size == len(byte_range):
+                self.ranges.pop().release()
+            else:
+                self.ranges[-1] = byte_range[chunk_size:]
+                byte_range.release()
+        return size
+
+    def close(self):
+        for byte_range in self.ranges:
+            byte_range.release()
+        self.ranges = []
+        super().close()
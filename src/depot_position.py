@@ -1,12 +1,14 @@
-import operator
-from bisect import insort
 from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
 from enum import Enum, auto
-from functools import reduce
+from typing import Sequence
 
 from Asset import Asset
 from transaction import Transaction, OpenCloseIndicator, BuySell
-from transaction_collection import TransactionCollection, to_single_transactions, to_opening_closing_pairs
+from transaction_collection import TransactionCollection, to_single_transactions_by_year, FifoMatcher, \
+    group_by_closing_year
+from transaction_table import TransactionTable
 
 
 class DepotPositionType(Enum):
@@ -16,15 +18,37 @@ class DepotPositionType(Enum):
 
 @dataclass
 class DepotPosition:
+    """
+    Transactions of an asset, from opening the position until it is closed.
+
+    Transactions are kept in a TransactionTable. They are appended as they come and sorted by date only when they
+    are read, keeping the order of transactions of the same date. The remaining quantity is kept as a running total.
+
+    The transaction collections of all years are built at once and kept until the next transaction is added.
+    Pairs of opening and closing transactions are then matched again from the end of the year before the earliest
+    added transaction.
+    """
     asset: Asset
-    transactions: list[Transaction] = field(default_factory=list)
+    transactions: Sequence[Transaction] = field(default_factory=list)
     closed: bool = False
+    _remaining_quantity: Decimal = field(default=Decimal(0), init=False, repr=False, compare=False)
+    _fifo_matcher: FifoMatcher = field(default_factory=FifoMatcher, init=False, repr=False, compare=False)
+    _collections_by_year: dict[int, list[TransactionCollection]] | None = field(default=None, init=False, repr=False,
+                                                                               compare=False)
+    # Date of the earliest transaction added since the transaction collections have been built
+    _changed_since: date | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.transactions = TransactionTable(self.transactions, sorted_by_date=True)
+        self._remaining_quantity = sum((transaction.quantity for transaction in self.transactions), Decimal(0))
 
     def add_transaction(self, txn: Transaction):
-        insort(self.transactions, txn, key=lambda t: t.date)
+        self.transactions.append(txn)
+        if self._changed_since is None or txn.date < self._changed_since:
+            self._changed_since = txn.date
 
-        remaining_quantity = reduce(operator.add, (transaction.quantity for transaction in self.transactions))
-        if remaining_quantity == 0:
+        self._remaining_quantity += txn.quantity
+        if self._remaining_quantity == 0:
             self.closed = True
 
     def position_type(self) -> DepotPositionType | None:
@@ -37,13 +61,26 @@ class DepotPosition:
         else:
             return DepotPositionType.SHORT
 
-    def transaction_collections(self, year: int) -> list[TransactionCollection]:
+    def _opening_closing_pairs_by_year(self) -> dict[int, list[TransactionCollection]]:
+        # Transactions before the earliest added one have kept their position
+        changed_from = (self.transactions.first_index_from(self._changed_since)
+                        if self._changed_since is not None else 0)
+        return group_by_closing_year(self._fifo_matcher.match(self.transactions, changed_from))
+
+    def _transaction_collections_by_year(self) -> dict[int, list[TransactionCollection]]:
         match self.asset.asset_class:
             case "STK" | "BILL":
-                return to_opening_closing_pairs(self.transactions, year)
+                return self._opening_closing_pairs_by_year()
             case "OPT":
                 if self.position_type() == DepotPositionType.SHORT:
-                    return to_single_transactions(self.transactions, year)
+                    return to_single_transactions_by_year(self.transactions)
                 elif self.position_type() == DepotPositionType.LONG:
-                    return to_opening_closing_pairs(self.transactions, year)
-        return []
+                    return self._opening_closing_pairs_by_year()
+        return {}
+
+    def transaction_collections(self, year: int) -> list[TransactionCollection]:
+        if self._collections_by_year is None or self._changed_since is not None:
+            self._collections_by_year = self._transaction_collections_by_year()
+            self._changed_since = None
+        return list(self._collections_by_year.get(year, []))
+
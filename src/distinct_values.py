@@ -0,0 +1,21 @@
+from typing import Any, Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def map_distinct(values: pd.Series, convert: Callable[[np.ndarray], Sequence], missing: Any = None,
+                 dtype: Any = object) -> pd.Series:
+    """
+    Converts each distinct value of a column only once and maps the results back onto the column. Columns of files
+    repeat their values a lot, e.g. dates, currency amounts or FX rates.
+
+    :param convert: Converts the distinct values, given as array, into a sequence of results in the same order
+    :param missing: Result for missing values (None, NaN, pd.NA), which are never passed to convert
+    :param dtype: Type of the resulting column
+    """
+    codes, uniques = pd.factorize(values)
+    results = np.empty(len(uniques) + 1, dtype=object)
+    results[:-1] = convert(uniques)
+    results[-1] = missing
+    return pd.Series(results[codes], index=values.index, name=values.name, dtype=dtype)
@@ -0,0 +1,58 @@
+from decimal import Decimal
+
+import pandas as pd
+
+from distinct_values import map_distinct
+
+# Money columns are stored as int64 in units of 10^-scale, e.g. 1.5 is stored as 1500000000 with a scale of 9.
+# IBKR reports commissions, and therefore net amounts, with up to 9 decimal places. Only the columns which are summed
+# up, other columns like TradePrice stay Decimal
+MONEY_COLUMN_SCALES = {
+    "TradeCommission": 9,
+    "Amount": 9
+}
+
+
+def fixed_point_from_decimal(value: Decimal, scale: int) -> int:
+    scaled_value = value.scaleb(scale)
+    if scaled_value != scaled_value.to_integral_value():
+        raise ValueError(f"{value} has more than {scale} decimal places")
+    return int(scaled_value)
+
+
+def decimal_from_fixed_point(value: int, scale: int) -> Decimal:
+    # Drop trailing zeros of the fraction, but never write integers in scientific notation (1E+2)
+    exponent = -scale
+    while exponent < 0 and value % 10 == 0:
+        value //= 10
+        exponent += 1
+    return Decimal(value).scaleb(exponent)
+
+
+def fixed_point_from_decimals(values: pd.Series, scale: int) -> pd.Series:
+    """
+    Converts a column of Decimals (None for empty cells) into a nullable int64 column with the given scale.
+    Raises ValueError if a value has more decimal places than the scale, OverflowError if it does not fit into int64.
+    """
+    return map_distinct(values, lambda uniques: [fixed_point_from_decimal(Decimal(value), scale) for value in uniques],
+                        pd.NA, "Int64")
+
+
+def decimals_from_fixed_point(values: pd.Series, scale: int) -> pd.Series:
+    """
+    Converts a nullable int64 column with the given scale into a column of Decimals, empty cells become None.
+    """
+    return map_distinct(values, lambda uniques: [decimal_from_fixed_point(int(value), scale) for value in uniques])
+
+
+def fixed_point_column_scale(column: str) -> int | None:
+    # Merged columns keep the scale of their source column, e.g. Amount_orig
+    base_column, _, _ = column.partition("_")
+    return MONEY_COLUMN_SCALES.get(base_column)
+
+
+def convert_fixed_point_to_decimals(df: pd.DataFrame):
+    for col in df.columns:
+        scale = fixed_point_column_scale(col)
+        if scale is not None and pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = decimals_from_fixed_point(df[col], scale)
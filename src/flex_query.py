@@ -1,17 +1,30 @@
+import io
+import mmap
+import re
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
-from typing import Iterator
+from itertools import repeat
+from typing import Self
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
 from pandas.errors import EmptyDataError
 
-from iterable_text_io import IterableTextIO
+from byte_ranges_io import ByteRangesIO
+from distinct_values import map_distinct
+from fixed_point import MONEY_COLUMN_SCALES, fixed_point_from_decimals, decimals_from_fixed_point
 
 
 class DataError(Exception):
     pass
 
 
-DATE_COLUMNS = ["Expiry", "ReportDate", "Date", "TradeDate"]
+DATE_COLUMNS = ["Expiry", "ReportDate", "Date", "TradeDate", "Date/Time"]
+DATE_FORMAT = "%Y%m%d"
+DECIMAL_COLUMNS = ["FXRateToBase", "Quantity", "Strike", "TradeQuantity", "TradePrice", "TradeGross",
+                   "TradeCommission", "TradeTax", "Amount"]
 STATEMENT_OF_FUNDS_SECTION_CODE = "STFU"
 STATEMENT_OF_FUNDS_COLUMNS = \
     ["CurrencyPrimary", "FXRateToBase", "AssetClass", "SubCategory", "Symbol", "Conid", "Buy/Sell",
@@ -23,6 +36,23 @@ TRADES_COLUMNS = \
     ["AssetClass", "Symbol", "Conid", "TradeID", "Open/CloseIndicator", "Buy/Sell", "Quantity", "TradeDate"]
 CORPORATE_ACTIONS_SECTION_CODE = "CORP"
 CORPORATE_ACTIONS_COLUMNS = ["AssetClass","Symbol","Description","Conid","Date/Time","Quantity","Type"]
+COLUMN_DTYPES = {col: "str" for col in DECIMAL_COLUMNS + DATE_COLUMNS} | {
+    "CurrencyPrimary": "category",
+    "AssetClass": "category",
+    "Buy/Sell": "category",
+    "Put/Call": "category",
+    "Open/CloseIndicator": "category",
+    "ActivityCode": "category",
+    "Conid": "str",
+    "TradeID": "str",
+    "OrderID": "str",
+    "LevelOfDetail": "category",
+    "TransactionID": "str",
+    "ActionID": "str"
+}
+# Sections are split into shards of at least this size, smaller shards are not worth starting a worker process
+MIN_SHARD_BYTES = 8 * 2 ** 20
+SECTION_LINE_PATTERN = re.compile(rb'^"(?:HEADER|DATA)","([^"]*)",', re.MULTILINE)
 
 
 def decimal_from_value(value: str):
@@ -32,64 +62,279 @@ def decimal_from_value(value: str):
     return Decimal(trimmed_value)
 
 
-def date_from_datetime(value: str):
-    date_value, _, _ = value.strip().partition(";")
-    return pd.to_datetime(date_value).date()
-
-
-def csv_part(all_lines: Iterator[str], section_code: str):
-    header_line = f"\"HEADER\",\"{section_code}\","
-    data_line = f"\"DATA\",\"{section_code}\","
-    for line in all_lines:
-        if line.startswith(data_line) or line.startswith(header_line):
-            yield line
-
-
-def read_csv_part(filebuf, section_code: str, required_columns: list[str]):
-    df = pd.read_csv(IterableTextIO(csv_part(filebuf, section_code)),
-                     usecols=required_columns,
-                     parse_dates=[col
-                                  for col in DATE_COLUMNS
-                                  if col in required_columns],
-                     converters={
-                         "FXRateToBase": decimal_from_value,
-                         "Quantity": decimal_from_value,
-                         "Strike": decimal_from_value,
-                         "TradeQuantity": decimal_from_value,
-                         "TradePrice": decimal_from_value,
-                         "TradeGross": decimal_from_value,
-                         "TradeCommission": decimal_from_value,
-                         "TradeTax": decimal_from_value,
-                         "Amount": decimal_from_value,
-                         "Date/Time": date_from_datetime
-                     },
-                     dtype={
-                         "CurrencyPrimary": "category",
-                         "AssetClass": "category",
-                         "Buy/Sell": "category",
-                         "Put/Call": "category",
-                         "Open/CloseIndicator": "category",
-                         "ActivityCode": "category",
-                         "Conid": "str",
-                         "TradeID": "str",
-                         "OrderID": "str",
-                         "LevelOfDetail": "category",
-                         "TransactionID": "str",
-                         "ActionID": "str"
-                     })
+class FlexQueryFileIndex:
+    """
+    Byte ranges of the sections of a Flex Query file.
+
+    The file is scanned once to record where the lines of each section (STFU, TRNT, CORP, ...) start and end.
+    Reading a section hands these byte ranges to the CSV parser as they are, the lines are neither split, nor
+    decoded, nor copied in Python.
+
+    Usage:
+    with FlexQueryFileIndex.from_file(filename) as sections:
+        df_trades = read_trades(filename, sections)
+    """
+    def __init__(self, buffer):
+        """
+        Indexes the sections of the given Flex Query file content.
+
+        :param buffer: Content of a Flex Query file, e.g. bytes or a memory-mapped file
+        """
+        self._mmap: mmap.mmap | None = None
+        self._buffer = memoryview(buffer)
+        self._ranges: dict[str, list[tuple[int, int]]] = {}
+        run_end_patterns: dict[bytes, re.Pattern] = {}
+        position = 0
+        while (match := SECTION_LINE_PATTERN.search(self._buffer, position)) is not None:
+            section_code = match.group(1)
+            run_end_pattern = run_end_patterns.get(section_code)
+            if run_end_pattern is None:
+                # A run of lines ends at the first line which does not belong to the same section
+                run_end_pattern = re.compile(rb'\n(?!"(?:HEADER|DATA)","' + re.escape(section_code) + rb'",)')
+                run_end_patterns[section_code] = run_end_pattern
+            run_end = run_end_pattern.search(self._buffer, match.start())
+            position = run_end.end() if run_end is not None else len(self._buffer)
+            self._ranges.setdefault(section_code.decode("utf-8"), []).append((match.start(), position))
+
+    @classmethod
+    def from_file(cls, filename: str) -> Self:
+        with open(filename, "rb") as file:
+            try:
+                file_mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be memory-mapped
+                return cls(b"")
+        index = cls(file_mmap)
+        index._mmap = file_mmap
+        return index
+
+    def section_codes(self) -> list[str]:
+        return list(self._ranges.keys())
+
+    def ranges(self, section_code: str) -> list[tuple[int, int]]:
+        return self._ranges.get(section_code, [])
+
+    def open(self, section_code: str) -> io.BufferedReader:
+        return io.BufferedReader(ByteRangesIO(self._buffer[start:end] for start, end in self.ranges(section_code)))
+
+    def close(self):
+        self._buffer.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A section is still being read, the mapping is released as soon as the reader is gone
+                pass
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def column_dtypes(columns: list[str]) -> dict[str, str]:
+    # Columns without an explicit type are left to the type inference of the C engine
+    return {col: COLUMN_DTYPES[col] for col in columns if col in COLUMN_DTYPES}
+
+
+def column_from_arrow(values: pa.ChunkedArray, col: str, dtype: str | None) -> pd.Series:
+    """
+    Converts a column read by pyarrow into the Series the C engine returns for it. Decimal and date columns stay
+    Arrow-backed strings, they are converted from their distinct values later on, see convert_decimals() and
+    convert_dates(). Category columns are dictionary encoded by Arrow, so the strings of each line are never
+    turned into Python objects.
+    """
+    if col in DECIMAL_COLUMNS or col in DATE_COLUMNS:
+        return pd.Series(pd.arrays.ArrowExtensionArray(values), name=col)
+    if dtype == "category":
+        categories = values.dictionary_encode().to_pandas()
+        return categories.cat.reorder_categories(sorted(categories.cat.categories)).rename(col)
+    if pa.types.is_null(values.type):
+        # An empty column is float64 with the C engine
+        return pd.Series(np.nan, index=pd.RangeIndex(len(values)), name=col)
+    series = values.to_pandas().rename(col)
+    if series.dtype == object:
+        # Missing values are NaN with the C engine, not None
+        series[series.isna().to_numpy()] = np.nan
+    return series
+
+
+def read_csv_with_pyarrow(sections: FlexQueryFileIndex, section_code: str, required_columns: list[str]) -> pd.DataFrame:
+    # Keep the column order of the file, like the C engine does
+    header = pd.read_csv(sections.open(section_code), nrows=0).columns
+    columns = [col for col in header if col in required_columns]
+    missing_columns = set(required_columns) - set(columns)
+    if missing_columns:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing_columns))}")
+
+    section = sections.open(section_code)
+    dtypes = column_dtypes(columns)
+    # Columns with an explicit type are read as strings and converted like with the C engine, the others are
+    # inferred by pyarrow
+    table = pyarrow.csv.read_csv(section,
+                                 read_options=pyarrow.csv.ReadOptions(use_threads=True),
+                                 convert_options=pyarrow.csv.ConvertOptions(
+                                     include_columns=columns,
+                                     column_types={col: pa.string() for col in dtypes},
+                                     strings_can_be_null=True))
+    return pd.concat([column_from_arrow(table.column(col), col, dtypes.get(col)) for col in columns], axis=1)
+
+
+def split_section(section: bytes, shards: int) -> list[bytes]:
+    """
+    Splits a section at line boundaries into up to the given number of parts of about the same size. Each part
+    starts with the header line of the section, so it can be read as a CSV file of its own.
+    """
+    header_end = section.find(b"\n") + 1
+    if header_end == 0 or shards < 2:
+        return [section]
+    starts = [header_end]
+    for shard in range(1, shards):
+        position = header_end + (len(section) - header_end) * shard // shards
+        line_end = section.find(b"\n", max(position, starts[-1]) - 1)
+        if line_end < 0 or line_end + 1 >= len(section):
+            break
+        if line_end + 1 > starts[-1]:
+            starts.append(line_end + 1)
+    header = section[:header_end]
+    return [header + section[start:end] for start, end in zip(starts, starts[1:] + [len(section)])]
+
+
+def read_csv_shard(shard: bytes, required_columns: list[str], fixed_point: bool) -> pd.DataFrame:
+    # Shards would not share their categories, category columns are read as strings
+    dtypes = {col: "str" if dtype == "category" else dtype for col, dtype in column_dtypes(required_columns).items()}
+    df = pd.read_csv(io.BytesIO(shard), usecols=required_columns, dtype=dtypes)
+    convert_decimals(df, fixed_point)
+    convert_dates(df)
+    return df
+
+
+def read_csv_in_shards(sections: FlexQueryFileIndex, section_code: str, required_columns: list[str],
+                       fixed_point: bool, shards: int) -> pd.DataFrame:
+    """
+    Reads a section like read_csv_part() with the C engine, but splits it into shards which are parsed and
+    converted by worker processes in parallel. Each shard has at least MIN_SHARD_BYTES, so small sections are read
+    by a single shard in the current process.
+    """
+    section = sections.open(section_code).read()
+    parts = split_section(section, min(shards, len(section) // MIN_SHARD_BYTES))
+    if len(parts) > 1:
+        with ProcessPoolExecutor(len(parts)) as executor:
+            frames = list(executor.map(read_csv_shard, parts, repeat(required_columns), repeat(fixed_point)))
+    else:
+        frames = [read_csv_shard(section, required_columns, fixed_point)]
+    # A column which does not fit its fixed point scale in one of the shards stays Decimal in all shards
+    for col, scale in MONEY_COLUMN_SCALES.items():
+        if col in required_columns and not all(pd.api.types.is_integer_dtype(frame[col].dtype) for frame in frames):
+            for frame in frames:
+                if pd.api.types.is_integer_dtype(frame[col].dtype):
+                    frame[col] = decimals_from_fixed_point(frame[col], scale)
+    df = concat_non_empty(frames).reset_index(drop=True)
+    del frames
+    # Sorted categories of the whole section, like the C engine does
+    for col, dtype in column_dtypes(required_columns).items():
+        if dtype == "category":
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_csv_part(sections: FlexQueryFileIndex, section_code: str, required_columns: list[str], fixed_point: bool = False,
+                  engine: str = "c", shards: int = 1):
+    """
+    Reads a section of a Flex Query file.
+
+    :param engine: CSV parser to use, "c" (default) or "pyarrow" (multi-threaded, requires pyarrow)
+    :param shards: Number of worker processes parsing parts of a large section in parallel (C engine only), see
+                   read_csv_in_shards()
+    """
+    if shards > 1 and engine == "c":
+        return read_csv_in_shards(sections, section_code, required_columns, fixed_point, shards)
+    match engine:
+        case "c":
+            df = pd.read_csv(sections.open(section_code),
+                             usecols=required_columns,
+                             dtype=column_dtypes(required_columns))
+        case "pyarrow":
+            df = read_csv_with_pyarrow(sections, section_code, required_columns)
+        case _:
+            raise ValueError(f"Unknown CSV engine {engine}")
+    convert_decimals(df, fixed_point)
+    convert_dates(df)
     return df
 
 
+def decimals_from_strings(values: pd.Series) -> pd.Series:
+    # Empty cells become None
+    return map_distinct(values.str.strip(), lambda uniques: [decimal_from_value(value) for value in uniques])
+
+
+def convert_decimals(df: pd.DataFrame, fixed_point: bool = False):
+    for col in DECIMAL_COLUMNS:
+        if col in df.columns:
+            df[col] = decimals_from_strings(df[col])
+            if fixed_point and col in MONEY_COLUMN_SCALES:
+                try:
+                    df[col] = fixed_point_from_decimals(df[col], MONEY_COLUMN_SCALES[col])
+                except (ValueError, OverflowError):
+                    # Values which do not fit the scale stay Decimal, like without fixed_point
+                    pass
+
+
+def dates_from_uniques(uniques: np.ndarray) -> np.ndarray:
+    # Date/Time values carry the time after a semicolon, e.g. 20220318;162000
+    date_values = pd.Series(uniques, dtype=object).str.split(";", n=1).str[0].str.strip()
+    dates = pd.to_datetime(date_values, format=DATE_FORMAT)
+    return np.where(dates.isna(), None, dates.dt.date.to_numpy(dtype=object))
+
+
+def dates_from_strings(values: pd.Series) -> pd.Series:
+    # All distinct values are parsed at once, empty cells become None
+    return map_distinct(values, dates_from_uniques)
+
+
 def convert_dates(df: pd.DataFrame):
     for col in DATE_COLUMNS:
         if col in df.columns:
-            df[col] = df[col].apply(lambda x: x.to_pydatetime().date() if pd.notna(x) else None)
+            df[col] = dates_from_strings(df[col])
+
+
+def forex_fx_rates(amounts: pd.Series, amounts_orig: pd.Series, fixed_point: bool) -> list[Decimal]:
+    # Both amounts have the same scale in fixed point, so the scale cancels out
+    if fixed_point:
+        amounts = (Decimal(int(amount)) for amount in amounts)
+        amounts_orig = (Decimal(int(amount_orig)) for amount_orig in amounts_orig)
+    return [abs(round(amount / amount_orig, 5)) for amount, amount_orig in zip(amounts, amounts_orig)]
 
 
-def read_statement_of_funds(filename: str, filebuf):
+def add_forex_fees(df: pd.DataFrame, forex_fees: pd.Series):
+    # Only lines of forex trades have fees, all other lines are left as they are
+    forex = df["TradeID"].isin(forex_fees.index).to_numpy()
+    df.loc[forex, "Amount"] += df.loc[forex, "TradeID"].map(forex_fees)
+
+
+def fix_forex_fx_rates(df: pd.DataFrame, fixed_point: bool):
+    # Fix FX rate because the current FX rate does not include trade commissions
+    forex = (df["ActivityCode"] == "FOREX").to_numpy()
+    fixed_point = fixed_point and pd.api.types.is_integer_dtype(df["Amount"].dtype)
+    df.loc[forex, "FXRateToBase_orig"] = forex_fx_rates(df.loc[forex, "Amount"], df.loc[forex, "Amount_orig"],
+                                                       fixed_point)
+
+
+def read_statement_of_funds(filename: str, sections: FlexQueryFileIndex, fixed_point: bool = False, engine: str = "c",
+                            shards: int = 1):
+    """
+    Reads the statement of funds, joining each line in base currency with its line in original currency.
+
+    With fixed_point, the money columns (see fixed_point.MONEY_COLUMN_SCALES) are returned as scaled int64
+    instead of Decimal, all aggregations run natively. A column with a value which does not fit its scale is
+    returned as Decimal. Use fixed_point.convert_fixed_point_to_decimals() to get Decimals again.
+
+    With shards, a large section is parsed by this many worker processes in parallel, see read_csv_in_shards().
+    """
     try:
-        df = read_csv_part(filebuf, STATEMENT_OF_FUNDS_SECTION_CODE, STATEMENT_OF_FUNDS_COLUMNS)
-        convert_dates(df)
+        df = read_csv_part(sections, STATEMENT_OF_FUNDS_SECTION_CODE, STATEMENT_OF_FUNDS_COLUMNS, fixed_point, engine,
+                           shards)
 
         # Base currency must be EUR because we are going to calculate German taxes which must be in EUR
         df_base_currency = df.query("LevelOfDetail == 'BaseCurrency'")
@@ -99,32 +344,36 @@ def read_statement_of_funds(filename: str, filebuf):
             return
 
         # Fees of forex transactions
-        df_forex_fees = (df
-                         .query(f"ActivityCode == 'FOREX' and LevelOfDetail == 'Currency' and CurrencyPrimary == '{base_currency}'")
-                         .groupby("TradeID", as_index=False)[["Amount"]]
-                         .sum())
-        df_base_currency = df_base_currency.merge(df_forex_fees, how="left", on="TradeID", suffixes=(None, "_forex_fee"))
-        df_base_currency["Amount_forex_fee"] = df_base_currency["Amount_forex_fee"].fillna(Decimal(0))
-        df_base_currency["Amount"] += df_base_currency["Amount_forex_fee"]
-        df_base_currency.drop(columns=["Amount_forex_fee"], inplace=True)
+        forex_fees = (df
+                      .query(f"ActivityCode == 'FOREX' and LevelOfDetail == 'Currency' and CurrencyPrimary == '{base_currency}'")
+                      .groupby("TradeID")["Amount"]
+                      .sum())
+        df_base_currency = df_base_currency.copy()
+        add_forex_fees(df_base_currency, forex_fees)
 
         df_orig_currency = df.query(f"LevelOfDetail == 'Currency' and CurrencyPrimary != '{base_currency}'")
         df = df_base_currency.merge(df_orig_currency, how="left", on="TransactionID", suffixes=(None, "_orig"))
 
-        # Fix FX rate because the current FX rate does not include trade commissions
-        df["FXRateToBase_orig"] = df.apply(
-            lambda row: abs(round(row["Amount"] / row["Amount_orig"], 5)) if row["ActivityCode"] == "FOREX"
-            else row["FXRateToBase_orig"], axis=1)
+        fix_forex_fx_rates(df, fixed_point)
 
         return df
     except Exception:
         raise DataError(filename)
 
 
-def read_trades(filename: str, filebuf):
+def concat_non_empty(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    # Empty frames would not take part in determining the dtypes in future versions of pandas
+    frames = [frame for frame in frames if not frame.empty] or frames[-1:]
+    df = pd.concat(frames)
+    # pandas fills object columns which are all None in every frame with NaN, keep the None of empty cells
+    for col in df.columns[(df.dtypes == object).to_numpy()]:
+        df[col] = np.concatenate([frame[col].to_numpy() for frame in frames])
+    return df
+
+
+def read_trades(filename: str, sections: FlexQueryFileIndex, engine: str = "c"):
     try:
-        df = read_csv_part(filebuf, TRADES_COLUMNS_SECTION_CODE, TRADES_COLUMNS)
-        convert_dates(df)
+        df = read_csv_part(sections, TRADES_COLUMNS_SECTION_CODE, TRADES_COLUMNS, engine=engine)
         df.sort_values(by="TradeDate", kind="stable", inplace=True)
         return df
     except EmptyDataError:
@@ -132,13 +381,41 @@ def read_trades(filename: str, filebuf):
     except Exception:
         raise DataError(filename)
 
-def read_corporate_actions(filename: str, filebuf):
+def read_corporate_actions(filename: str, sections: FlexQueryFileIndex, engine: str = "c"):
     try:
-        df = read_csv_part(filebuf, CORPORATE_ACTIONS_SECTION_CODE, CORPORATE_ACTIONS_COLUMNS)
-        convert_dates(df)
+        df = read_csv_part(sections, CORPORATE_ACTIONS_SECTION_CODE, CORPORATE_ACTIONS_COLUMNS, engine=engine)
         df.sort_values(by="Date/Time", kind="stable", inplace=True)
         return df
     except EmptyDataError:
         return pd.DataFrame(columns=CORPORATE_ACTIONS_COLUMNS)
     except Exception:
         raise DataError(filename)
+
+
+def read_flex_query(filename: str, content, shards: int = 1) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Reads trades, statement of funds and corporate actions of a Flex Query file, mixing trade data into statement
+    data and vice versa.
+
+    :param filename: Name of the file, used in error messages only
+    :param content: Content of the file, e.g. the bytes of an uploaded file
+    :param shards: Number of worker processes parsing a large statement of funds in parallel
+    """
+    # Index the sections in a single pass, each section is then parsed straight from the content
+    sections = FlexQueryFileIndex(content)
+    df_trades = read_trades(filename, sections)
+    df_statement_of_funds = read_statement_of_funds(filename, sections, shards=shards)
+    df_corporate_actions = read_corporate_actions(filename, sections)
+
+    # Mix trade data into statement data and vice versa
+    df_trades = df_trades.merge(df_statement_of_funds.filter(["TradeID", "AssetClass", "Symbol", "Buy/Sell",
+                                                              "Date", "ActivityDescription", "TradeQuantity",
+                                                              "Amount", "CurrencyPrimary", "Amount_orig",
+                                                              "CurrencyPrimary_orig", "FXRateToBase_orig",
+                                                              "SubCategory"]),
+                                how="left",
+                                on=["TradeID", "AssetClass", "Symbol", "Buy/Sell"])
+    df_statement_of_funds = df_statement_of_funds.merge(df_trades.filter(["TradeID", "Open/CloseIndicator"]),
+                                                        how="left",
+                                                        on="TradeID")
+    return df_trades, df_statement_of_funds, df_corporate_actions
@@ -1,13 +1,36 @@
 from dataclasses import dataclass, field
+from typing import Sequence
 
 from transaction import Transaction, BuySell, OpenCloseIndicator
-from transaction_collection import to_opening_closing_pairs, TransactionPair
+from transaction_collection import TransactionPair, FifoMatcher, group_by_closing_year, apply_estg_23
+from transaction_table import TransactionTable
+from vectorized_fifo import match_fifo_vectorized
 
 
 @dataclass
 class ForeignCurrencyAccount:
+    """
+    Flows of a foreign currency, kept in a TransactionTable. The transaction pairs of all years are built at once and
+    kept until the next transaction is added, they are then matched again from the start of the year of the first
+    added transaction.
+
+    With vectorized=True, all transactions are matched at once with array operations instead, see
+    match_fifo_vectorized(), which is faster for accounts with many flows.
+    """
     currency: str
-    transactions: list[Transaction] = field(default_factory=list)
+    transactions: Sequence[Transaction] = field(default_factory=list)
+    vectorized: bool = field(default=False, compare=False)
+    _fifo_matcher: FifoMatcher = field(default_factory=FifoMatcher, init=False, repr=False, compare=False)
+    # Number of transactions the transaction pairs have been built of
+    _matched_count: int = field(default=0, init=False, repr=False, compare=False)
+    _pairs_by_year: dict[int, list[TransactionPair]] | None = field(default=None, init=False, repr=False,
+                                                                  compare=False)
+    # Transaction pairs with §23 EStG applied, by year, as long as the transaction pairs are not built again
+    _estg_23_pairs_by_year: dict[int, list[TransactionPair]] = field(default_factory=dict, init=False, repr=False,
+                                                                     compare=False)
+
+    def __post_init__(self):
+        self.transactions = TransactionTable(self.transactions)
 
     def add_transaction(self, txn: Transaction):
         if txn.amount_orig is None:
@@ -27,5 +50,28 @@ class ForeignCurrencyAccount:
             raise ValueError("Buy must match open, sell must match close")
         self.transactions.append(txn)
 
+    def _transaction_pairs_by_year(self) -> dict[int, list[TransactionPair]]:
+        if self._pairs_by_year is None or self._matched_count != len(self.transactions):
+            if self.vectorized:
+                transaction_pairs = match_fifo_vectorized(self.transactions)
+            else:
+                # Transactions are only ever appended
+                transaction_pairs = self._fifo_matcher.match(self.transactions, self._matched_count)
+            self._pairs_by_year = group_by_closing_year(transaction_pairs)
+            self._matched_count = len(self.transactions)
+            self._estg_23_pairs_by_year = {}
+        return self._pairs_by_year
+
     def transaction_pairs(self, year: int) -> list[TransactionPair]:
-        return to_opening_closing_pairs(self.transactions, year)
+        return list(self._transaction_pairs_by_year().get(year, []))
+
+    def estg_23_transaction_pairs(self, year: int) -> list[TransactionPair]:
+        """
+        Returns the transaction pairs of the given year with §23 EStG applied, see apply_estg_23(). They are kept
+        until the transaction pairs are built again.
+        """
+        pairs_by_year = self._transaction_pairs_by_year()
+        if year not in self._estg_23_pairs_by_year:
+            self._estg_23_pairs_by_year[year] = apply_estg_23(pairs_by_year.get(year, []))
+        return list(self._estg_23_pairs_by_year[year])
+
@@ -4,7 +4,7 @@ from datetime import date
 from money import Money
 
 
-@dataclass
+@dataclass(slots=True)
 class Forex:
     tradeId: str
     date: date
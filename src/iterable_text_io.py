@@ -1,5 +1,5 @@
 import io
-from typing import Iterator
+from typing import Iterable
 
 
 class IterableTextIO(io.TextIOBase):
@@ -10,21 +10,53 @@ class IterableTextIO(io.TextIOBase):
     with IterableTextIO(some_iterable_of_string) as s:
         df = pd.read_csv(s)
 
+    Each read joins as many strings as needed to return the requested number of characters, so a parser asking
+    for large blocks gets large blocks instead of a single line per call.
+
     This class has been influenced by https://stackoverflow.com/a/20260030
     """
-    def __init__(self, iterable: Iterator[str]):
+    def __init__(self, iterable: Iterable[str]):
         """
         Creates a new instance which allow reading an iterable of strings like a file.
 
         :param iterable: Iterable of strings
         """
-        self.iterable = iterable
-        self.leftover = None
-
-    def read(self, size: int = -1) -> str:
-        try:
-            chunk = self.leftover or next(self.iterable)
-            output, self.leftover = chunk[:size], chunk[size:]
-            return output
-        except StopIteration:
-            return ""    # indicate EOF
+        self.iterable = iter(iterable)
+        self.leftover = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self, size: int, stop_at_line_end: bool) -> None:
+        # Join strings until at least size characters (or a whole line) are available or the iterable is exhausted
+        chunks = [self.leftover]
+        length = len(self.leftover)
+        found_line_end = stop_at_line_end and "\n" in self.leftover
+        while (size < 0 or length < size) and not found_line_end:
+            chunk = next(self.iterable, None)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            length += len(chunk)
+            found_line_end = stop_at_line_end and "\n" in chunk
+        self.leftover = "".join(chunks)
+
+    def read(self, size: int | None = -1) -> str:
+        if size is None:
+            size = -1
+        self._fill(size, False)
+        if 0 <= size < len(self.leftover):
+            output, self.leftover = self.leftover[:size], self.leftover[size:]
+        else:
+            output, self.leftover = self.leftover, ""
+        return output    # an empty string indicates EOF
+
+    def readline(self, size: int | None = -1) -> str:
+        if size is None:
+            size = -1
+        self._fill(size, True)
+        end = self.leftover.find("\n") + 1 or len(self.leftover)
+        if 0 <= size < end:
+            end = size
+        output, self.leftover = self.leftover[:end], self.leftover[end:]
+        return output
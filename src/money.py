@@ -1,7 +1,7 @@
 import numbers
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Self
+from typing import Iterable, Iterator, Self, Sequence
 
 
 class CurrencyMismatchError(Exception):
@@ -11,7 +11,7 @@ class CurrencyMismatchError(Exception):
         self.found_currency = found_currency
 
 
-@dataclass
+@dataclass(slots=True)
 class Money:
     amount: Decimal
     currency: str
@@ -19,6 +19,33 @@ class Money:
     def __str__(self):
         return f"{self.amount} {self.currency}"
 
+    @staticmethod
+    def sum(monies: Iterable["Money"]) -> "Money":
+        """
+        Adds up amounts of the same currency. Unlike reduce(operator.add, ...), only the currency codes are compared
+        and the amounts are added as Decimals, without a Money object per intermediate sum.
+
+        :raises ValueError: if there is no money at all, its currency would be unknown
+        """
+        iterator = iter(monies)
+        try:
+            first = next(iterator)
+        except StopIteration:
+            raise ValueError("Sum of no money has no currency") from None
+        if not isinstance(first, Money):
+            raise TypeError("Operand must be of type Money")
+        currency = first.currency
+        total = first.amount
+        for money in iterator:
+            if not isinstance(money, Money):
+                raise TypeError("Operand must be of type Money")
+            if money.currency != currency:
+                raise CurrencyMismatchError(f"Expected currency {currency}, got currency {money.currency}",
+                                            currency,
+                                            money.currency)
+            total += money.amount
+        return Money(total, currency)
+
     def _validate_money_with_same_currency(self, other: Self):
         if not isinstance(other, Money):
             raise TypeError("Operand must be of type Money")
@@ -120,3 +147,49 @@ class Money:
             return Money(self.amount.quantize(exp, rounding, context), self.currency)
         else:
             raise ValueError("exp must be either Money or Decimal")
+
+
+@dataclass(slots=True)
+class MoneyVector:
+    """
+    Amounts of one currency, which are negated, converted or quantized all at once. The currency is checked once when
+    the vector is built, and no Money object is created per amount. The currency is None if the vector is empty.
+    """
+    amounts: list[Decimal]
+    currency: str | None
+
+    @classmethod
+    def of(cls, monies: Iterable[Money]) -> Self:
+        currency = None
+        amounts = []
+        for money in monies:
+            if not isinstance(money, Money):
+                raise TypeError("Operand must be of type Money")
+            if currency is None:
+                currency = money.currency
+            elif money.currency != currency:
+                raise CurrencyMismatchError(f"Expected currency {currency}, got currency {money.currency}",
+                                            currency,
+                                            money.currency)
+            amounts.append(money.amount)
+        return cls(amounts, currency)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __iter__(self) -> Iterator[Money]:
+        return (Money(amount, self.currency) for amount in self.amounts)
+
+    def __neg__(self) -> Self:
+        return MoneyVector([-amount for amount in self.amounts], self.currency)
+
+    def quantize(self, exp: Decimal, rounding=None, context=None) -> Self:
+        return MoneyVector([amount.quantize(exp, rounding, context) for amount in self.amounts], self.currency)
+
+    def convert(self, fx_rates: Sequence[Decimal], currency: str) -> Self:
+        """
+        Converts each amount with its own exchange rate into the given currency.
+        """
+        if len(fx_rates) != len(self.amounts):
+            raise ValueError(f"Expected {len(self.amounts)} exchange rates, got {len(fx_rates)}")
+        return MoneyVector([amount * fx_rate for amount, fx_rate in zip(self.amounts, fx_rates)], currency)
@@ -1,41 +1,51 @@
-import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import streamlit as st
 
-from flex_query import DataError, read_statement_of_funds, read_trades, STATEMENT_OF_FUNDS_COLUMNS, TRADES_COLUMNS, \
-    read_corporate_actions
+from flex_query import DataError, STATEMENT_OF_FUNDS_COLUMNS, TRADES_COLUMNS, read_flex_query
 from page.utils import render_footer
+from parse_cache import ParseCache
 from report import Report
 
 
-def create_report(data_files: list):
+def read_data_files(data_files: list, cache: ParseCache | None,
+                    max_workers: int) -> list[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+    """
+    Reads each file, see read_flex_query(). Files which are not cached yet are read in parallel by up to max_workers
+    processes, one file per process. The DataFrames are returned in the order of data_files.
+    """
+    contents = [data_file.getvalue() for data_file in data_files]
+    all_frames = [cache.get(content) if cache is not None else None for content in contents]
+    missing = [index for index, frames in enumerate(all_frames) if frames is None]
+    filenames = [data_files[index].name for index in missing]
+    missing_contents = [contents[index] for index in missing]
+    workers = min(len(missing), max_workers)
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            parsed_frames = list(executor.map(read_flex_query, filenames, missing_contents))
+    else:
+        parsed_frames = list(map(read_flex_query, filenames, missing_contents))
+    for index, frames in zip(missing, parsed_frames):
+        all_frames[index] = frames
+        if cache is not None:
+            cache.put(contents[index], frames)
+    return all_frames
+
+
+def create_report(data_files: list, cache: ParseCache | None = None, max_workers: int = 1):
+    """
+    Reads the data files, see read_data_files(), and ingests them into a Report.
+    """
     df_all_trades = []
     df_all_statement_of_funds = []
     df_all_corporate_actions = []
-    for data_file in data_files:
-        data_file_content = data_file.getvalue().decode("utf-8")
-        df_trades = read_trades(data_file.name, io.StringIO(data_file_content))
-        df_statement_of_funds = read_statement_of_funds(data_file.name, io.StringIO(data_file_content))
-        df_corporate_actions = read_corporate_actions(data_file.name, io.StringIO(data_file_content))
-
-
-        # Mix trade data into statement data and vice versa
-        df_trades = df_trades.merge(df_statement_of_funds.filter(["TradeID", "AssetClass", "Symbol", "Buy/Sell",
-                                                                  "Date", "ActivityDescription", "TradeQuantity",
-                                                                  "Amount", "CurrencyPrimary", "Amount_orig",
-                                                                  "CurrencyPrimary_orig", "FXRateToBase_orig",
-                                                                  "SubCategory"]),
-                                    how="left",
-                                    on=["TradeID", "AssetClass", "Symbol", "Buy/Sell"])
+    for df_trades, df_statement_of_funds, df_corporate_actions in read_data_files(data_files, cache, max_workers):
         if not df_trades.empty:
             df_all_trades.append(df_trades)
-        df_statement_of_funds = df_statement_of_funds.merge(df_trades.filter(["TradeID", "Open/CloseIndicator"]),
-                                                            how="left",
-                                                            on="TradeID")
         if not df_statement_of_funds.empty:
             df_all_statement_of_funds.append(df_statement_of_funds)
-
         if not df_corporate_actions.empty:
             df_all_corporate_actions.append(df_corporate_actions)
 
@@ -46,12 +56,21 @@ def create_report(data_files: list):
 
     result = Report()
     if df_all_trades:
-        pd.concat(df_all_trades).apply(lambda row: result.process_trade(row), axis=1)
+        df_trades = pd.concat(df_all_trades)
+        result.ingest_trades(df_trades)
     if df_all_statement_of_funds:
-        pd.concat(df_all_statement_of_funds).apply(lambda row: result.process_statement(row), axis=1)
+        df_statement_of_funds = pd.concat(df_all_statement_of_funds)
+        result.ingest_statements(df_statement_of_funds)
     return result
 
 
+@st.cache_resource
+def get_parse_cache() -> ParseCache | None:
+    # Parsed files are only kept on disk if explicitly configured, e.g. when running on your own computer
+    cache_directory = os.environ.get("IBKR_STEUERRECHNER_CACHE_DIR")
+    return ParseCache(cache_directory) if cache_directory else None
+
+
 st.title("Daten hochladen")
 
 # Do not use the whole width to display the introduction, use a smaller part to make it better readable
@@ -69,7 +88,7 @@ if uploads:
     intro.write("Daten wurden hochgeladen, durch einen Klick können Sie die Auswertung starten.")
     if intro.button("Auswertung starten", type="primary"):
         try:
-            report = create_report(uploads)
+            report = create_report(uploads, get_parse_cache(), os.process_cpu_count() or 1)
             st.session_state["report"] = report
             if report.has_data():
                 st.switch_page("page/result/deposits.py")
@@ -0,0 +1,162 @@
+import datetime
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from distinct_values import map_distinct
+from flex_query import DATE_COLUMNS, DECIMAL_COLUMNS
+
+# Increase whenever the parsed DataFrames change, e.g. new columns or other dtypes; entries of other versions are
+# removed when the cache is opened
+FORMAT_VERSION = 2
+# Subdirectory of the cache directory, which may contain other files as well; only this one is ever changed
+CACHE_SUBDIRECTORY = "ibkr-parse-cache"
+VERSION_DIRECTORY_PATTERN = re.compile(r"v\d+")
+FRAME_NAMES = ["trades", "statement_of_funds", "corporate_actions"]
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def content_hash(content) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def column_kind(column: str) -> str | None:
+    # Merged columns keep the kind of their source column, e.g. Amount_orig
+    base_column = column.removesuffix("_orig")
+    if base_column in DECIMAL_COLUMNS:
+        return "decimal"
+    if base_column in DATE_COLUMNS:
+        return "date"
+    return None
+
+
+def encode_column(values: pd.Series, kind: str) -> pd.Series:
+    # Parquet has no column type for arbitrary Decimals, store them as strings. Empty cells (None) are stored as an
+    # empty string, missing lines of a merge (NaN) as null, so both can be told apart when reading.
+    encode = str if kind == "decimal" else datetime.date.isoformat
+    strings = map_distinct(values, lambda uniques: [encode(value) for value in uniques])
+    strings[values.to_numpy() == None] = ""  # noqa: E711, element-wise comparison
+    return strings
+
+
+def decode_column(values: pd.Series, kind: str) -> pd.Series:
+    decode = Decimal if kind == "decimal" else datetime.date.fromisoformat
+    return map_distinct(values, lambda uniques: [None if value == "" else decode(value) for value in uniques], np.nan)
+
+
+def write_frame(df: pd.DataFrame, path: str):
+    df = df.copy()
+    for col in df.columns:
+        kind = column_kind(col)
+        if kind is not None and df[col].dtype == object:
+            df[col] = encode_column(df[col], kind)
+    # Parquet keeps only the categories in use, e.g. none of an empty frame
+    df.attrs = {"categories": {col: df[col].cat.categories.tolist()
+                               for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}}
+    df.to_parquet(path, engine="pyarrow")
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    df = pd.read_parquet(path, engine="pyarrow")
+    categories = df.attrs.pop("categories")
+    for col in df.columns:
+        kind = column_kind(col)
+        if col in categories:
+            df[col] = df[col].astype(pd.CategoricalDtype(categories[col]))
+        elif df[col].dtype == object:
+            if kind is not None:
+                df[col] = decode_column(df[col], kind)
+            else:
+                # Missing values of string columns are NaN after parsing, not None
+                df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+class ParseCache:
+    """
+    Parsed Flex Query files, stored as Parquet files in a local directory.
+
+    Each file is keyed by the SHA-256 hash of its content, so a file is parsed only once, regardless of its name.
+    Entries are evicted least recently used first as soon as the cache grows beyond max_bytes.
+
+    Usage:
+    cache = ParseCache(directory)
+    frames = cache.get(content)
+    if frames is None:
+        frames = read_flex_query(filename, content)
+        cache.put(content, frames)
+    """
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Opens the cache in the given directory, which is created if needed.
+
+        :param directory: Directory of the cache, shared by all instances using the same directory. The entries are
+                          stored in its subdirectory ibkr-parse-cache, nothing else in it is touched.
+        :param max_bytes: Maximum size of all entries
+        """
+        cache_directory = os.path.join(directory, CACHE_SUBDIRECTORY)
+        self.directory = os.path.join(cache_directory, f"v{FORMAT_VERSION}")
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        for entry in os.scandir(cache_directory):
+            if (entry.is_dir(follow_symlinks=False) and VERSION_DIRECTORY_PATTERN.fullmatch(entry.name)
+                    and entry.path != self.directory):
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _entry_path(self, content) -> str:
+        return os.path.join(self.directory, content_hash(content))
+
+    def get(self, content) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame] | None:
+        """
+        Returns the DataFrames of the given file content (trades, statement of funds, corporate actions), or None
+        if the content has not been cached.
+        """
+        entry_path = self._entry_path(content)
+        try:
+            frames = tuple(read_frame(os.path.join(entry_path, f"{name}.parquet")) for name in FRAME_NAMES)
+            # Mark as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        return frames
+
+    def put(self, content, frames: tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]):
+        """
+        Stores the DataFrames of the given file content (trades, statement of funds, corporate actions), then
+        evicts the least recently used entries until the cache fits into max_bytes again.
+        """
+        entry_path = self._entry_path(content)
+        # Write into a temporary directory first, so concurrent readers never see an incomplete entry
+        temp_path = tempfile.mkdtemp(dir=self.directory, prefix=".")
+        try:
+            for name, df in zip(FRAME_NAMES, frames):
+                write_frame(df, os.path.join(temp_path, f"{name}.parquet"))
+            try:
+                os.rename(temp_path, entry_path)
+            except OSError:
+                # Stored by someone else in the meantime
+                shutil.rmtree(temp_path, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and not entry.name.startswith("."):
+                size = sum(file.stat().st_size for file in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
@@ -1,10 +1,12 @@
+import sys
 from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
 from io import BytesIO
 from itertools import groupby
-from typing import Iterable, Self
+from typing import Any, Iterable, Iterator, Mapping, Self
 
+import numpy as np
 import pandas as pd
 
 from Asset import Asset
@@ -14,30 +16,52 @@ from dividend import Dividend
 from foreign_currency_account import ForeignCurrencyAccount
 from forex import Forex
 from interest import Interest
-from money import Money
+from money import Money, MoneyVector
 from option import Option
 from other_fee import OtherFee
 from stock import Stock
 from transaction import Transaction, BuySell, OpenCloseIndicator, AcquisitionType
-from transaction_collection import apply_estg_23, TransactionCollection
+from transaction_collection import TransactionCollection
 from treasury_bill import TreasuryBill
 from unknown_line import UnknownLine
 
+# A line of a DataFrame, column name to value
+Row = Mapping[str, Any]
+
+
+def column_values(values: pd.Series) -> np.ndarray:
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.to_numpy(dtype=object)
+    # Categories like currency codes are interned, so all files (and all objects built of them) share one string
+    categories = [sys.intern(category) if isinstance(category, str) else category
+                  for category in values.cat.categories]
+    return np.array(categories + [np.nan], dtype=object)[values.cat.codes.to_numpy()]
+
+
+def rows(df: pd.DataFrame) -> Iterator[dict[str, Any]]:
+    """
+    Yields each row of the DataFrame as a dict. Much cheaper than a Series per row, e.g. by apply(axis=1), because
+    each column is converted into a plain array only once.
+    """
+    columns = df.columns.tolist()
+    for values in zip(*(column_values(df[col]) for col in columns)):
+        yield dict(zip(columns, values))
+
 
 @dataclass
 class Result:
     year: int
     df: pd.DataFrame
 
-    def total(self, column: str) -> float:
+    def total(self, column: str) -> Decimal:
         data = self.df[column]
         return data.sum()
 
-    def total_positive(self, column: str) -> float:
+    def total_positive(self, column: str) -> Decimal:
         data = self.df[column]
         return data[data >= 0].sum()
 
-    def total_negative(self, column: str) -> float:
+    def total_negative(self, column: str) -> Decimal:
         data = self.df[column]
         return data[data < 0].sum()
 
@@ -65,7 +89,11 @@ class Result:
 
 
 class Report:
-    def __init__(self):
+    def __init__(self, vectorized_fifo: bool = False):
+        """
+        :param vectorized_fifo: Match the flows of foreign currency accounts with array operations
+        """
+        self._vectorized_fifo = vectorized_fifo
         self._years: set[str] = set()
         self._deposits: list[Deposit] = []
         self._interests: list[Interest] = []
@@ -77,30 +105,35 @@ class Report:
         self._forexes: list[Forex] = []
         self._foreign_currency_accounts: dict[str, ForeignCurrencyAccount] = {}
         self._unknown_lines: list[UnknownLine] = []
+        # Positions which are not closed yet by asset class and Conid; T-bills by symbol as well, oldest first
+        self._open_positions: dict[str, dict[str, DepotPosition]] = {"STK": {}, "OPT": {}, "BILL": {}}
+        self._open_treasury_bills_by_symbol: dict[str, list[TreasuryBill]] = {}
+        # One instance of each asset, shared by all positions of its Conid
+        self._assets: dict[Asset, Asset] = {}
 
     def register_year(self, row_date: date):
         self._years.add(str(row_date.year))
 
-    def add_deposit(self, row: pd.Series):
+    def add_deposit(self, row: Row):
         deposit = Deposit(row["Date"],
                           Money(row["Amount"], row["CurrencyPrimary"]),
                           row["ActivityDescription"])
         self._deposits.append(deposit)
 
-    def add_interest(self, row: pd.Series):
+    def add_interest(self, row: Row):
         interest = Interest(row["Date"],
                             Money(row["Amount"], row["CurrencyPrimary"]),
                             row["ActivityDescription"])
         self._interests.append(interest)
         self.add_foreign_currency_flow(row, False)
 
-    def add_other_fee(self, row: pd.Series):
+    def add_other_fee(self, row: Row):
         other_fee = OtherFee(row["Date"],
                              Money(row["Amount"], row["CurrencyPrimary"]),
                              row["ActivityDescription"])
         self._other_fees.append(other_fee)
 
-    def add_dividend(self, row: pd.Series):
+    def add_dividend(self, row: Row):
         dividend = Dividend(row["Date"],
                             row["ReportDate"],
                             Money(row["Amount"], row["CurrencyPrimary"]),
@@ -111,11 +144,11 @@ class Report:
         self._dividends.append(dividend)
         self.add_foreign_currency_flow(row, False)
 
-    def _process_treasury_bill(self, row: pd.Series):
-        symbol = row["Symbol"]
-        depot_position = next((p for p in self._treasury_bills if p.asset.symbol == symbol and not p.closed), None)
-        if depot_position is None:
+    def _process_treasury_bill(self, row: Row):
+        open_treasury_bills = self._open_treasury_bills_by_symbol.get(row["Symbol"])
+        if not open_treasury_bills:
             return
+        depot_position = open_treasury_bills[0]
         # Maturity record does not include quantity, so we copy it from amount with 1 quantity = 1 USD
         maturity_transaction = Transaction(
             None,
@@ -129,17 +162,17 @@ class Report:
             Money(row["Amount_orig"], row["CurrencyPrimary_orig"]),
             row["FXRateToBase_orig"]
         )
-        depot_position.add_transaction(maturity_transaction)
+        self._add_transaction(depot_position, maturity_transaction)
         self.add_foreign_currency_flow(row, True)
 
-    def add_foreign_currency_flow(self, row: pd.Series, taxable: bool):
+    def add_foreign_currency_flow(self, row: Row, taxable: bool):
         foreign_currency_code = row["CurrencyPrimary_orig"]
         if not foreign_currency_code or pd.isna(foreign_currency_code):
             return
 
         foreign_currency_account = self._foreign_currency_accounts.get(foreign_currency_code, None)
         if foreign_currency_account is None:
-            foreign_currency_account = ForeignCurrencyAccount(foreign_currency_code)
+            foreign_currency_account = ForeignCurrencyAccount(foreign_currency_code, vectorized=self._vectorized_fifo)
             self._foreign_currency_accounts[foreign_currency_code] = foreign_currency_account
 
         amount_orig = Money(row["Amount_orig"].quantize(Decimal("1.00")), row["CurrencyPrimary_orig"])
@@ -157,7 +190,7 @@ class Report:
             AcquisitionType.GENUINE if taxable else AcquisitionType.NON_GENUINE
         ))
 
-    def add_forex(self, row: pd.Series):
+    def add_forex(self, row: Row):
         forex = Forex(row["TradeID"],
                       row["Date"],
                       row["ActivityDescription"],
@@ -166,7 +199,7 @@ class Report:
         self._forexes.append(forex)
         self.add_foreign_currency_flow(row, True)
 
-    def add_unknown_line(self, row: pd.Series):
+    def add_unknown_line(self, row: Row):
         unknown_line = UnknownLine(row["Date"],
                                    Money(row["Amount"], row["CurrencyPrimary"]),
                                    row["ActivityDescription"])
@@ -253,8 +286,7 @@ class Report:
 
         transactions = (transaction
                         for stock in self._stocks
-                        for transaction in stock.transactions
-                        if transaction.date.year == year)
+                        for transaction in stock.transactions.in_year(year))
         return pd.DataFrame(columns=["sequence", "date", "activity", "stock_type", "trade_id", "quantity", "amount"],
                             data=stock_line(transactions))
 
@@ -303,8 +335,7 @@ class Report:
 
         transactions = (transaction
                         for t_bill in self._treasury_bills
-                        for transaction in t_bill.transactions
-                        if transaction.date.year == year)
+                        for transaction in t_bill.transactions.in_year(year))
         return pd.DataFrame(columns=["sequence", "date", "activity", "trade_id", "quantity", "amount"],
                             data=tbill_line(transactions))
 
@@ -371,12 +402,25 @@ class Report:
 
     def get_foreign_currencies(self, year: int, interest_bearing_account: bool):
 
-        def currency_line(transactions: Iterable[TransactionCollection]):
+        def currency_line(transactions: list[TransactionCollection]):
+            opening_transactions = [opening_transaction
+                                    for transaction in transactions
+                                    for opening_transaction in transaction.get_opening_transactions()]
+            closing_transactions = [transaction.get_closing_transaction() for transaction in transactions]
+            # Round the amounts of the whole account at once, each vector holds amounts of a single currency
+            cent = Decimal("1.00")
+            opening_amounts_orig = MoneyVector.of(txn.amount_orig for txn in opening_transactions).quantize(cent)
+            opening_amounts = MoneyVector.of(txn.amount for txn in opening_transactions).quantize(cent)
+            closing_amounts_orig = MoneyVector.of(txn.amount_orig for txn in closing_transactions).quantize(cent)
+            closing_amounts = MoneyVector.of(txn.amount for txn in closing_transactions).quantize(cent)
+            profits = (-MoneyVector.of(transaction.profit() for transaction in transactions)).quantize(cent)
+            opening_index = 0
             for transaction_no, transaction in enumerate(transactions, 1):
-                profit = -transaction.profit()
-                for opening_txn_no, opening_transaction in enumerate(transaction.get_opening_transactions()):
+                opening_count = len(transaction.get_opening_transactions())
+                for opening_txn_no in range(opening_count):
+                    opening_transaction = opening_transactions[opening_index]
                     if opening_txn_no == 0:
-                        title = "Zugang" if len(transaction.get_opening_transactions()) == 1 else "Zugänge"
+                        title = "Zugang" if opening_count == 1 else "Zugänge"
                     else:
                         title = ""
                     yield (transaction_no,
@@ -385,28 +429,30 @@ class Report:
                            opening_transaction.activity,
                            opening_transaction.trade_id,
                            opening_transaction.acquisition == AcquisitionType.GENUINE or interest_bearing_account,
-                           round(opening_transaction.amount_orig.amount, 2),
+                           opening_amounts_orig.amounts[opening_index],
                            opening_transaction.fx_rate,
-                           round(opening_transaction.amount.amount, 2),
+                           opening_amounts.amounts[opening_index],
                            None)
-                closing_transaction = transaction.get_closing_transaction()
+                    opening_index += 1
+                closing_transaction = closing_transactions[transaction_no - 1]
                 yield (transaction_no,
                        "Abgang",
                        closing_transaction.date,
                        closing_transaction.activity,
                        closing_transaction.trade_id,
                        closing_transaction.acquisition == AcquisitionType.GENUINE or interest_bearing_account,
-                       round(closing_transaction.amount_orig.amount, 2),
+                       closing_amounts_orig.amounts[transaction_no - 1],
                        closing_transaction.fx_rate,
-                       round(closing_transaction.amount.amount, 2),
-                       round(profit.amount, 2))
+                       closing_amounts.amounts[transaction_no - 1],
+                       profits.amounts[transaction_no - 1])
 
         result: dict[str, Result] = {}
         for currency in sorted(self._foreign_currency_accounts.keys()):
             account = self._foreign_currency_accounts[currency]
-            transaction_pairs = account.transaction_pairs(year)
-            if not interest_bearing_account:
-                transaction_pairs = apply_estg_23(transaction_pairs)
+            if interest_bearing_account:
+                transaction_pairs = account.transaction_pairs(year)
+            else:
+                transaction_pairs = account.estg_23_transaction_pairs(year)
             df = pd.DataFrame(columns=["sequence",
                                        "foreign_currency",
                                        "date",
@@ -433,7 +479,7 @@ class Report:
         result = Result(year, df)
         return result
 
-    def process_statement(self, row: pd.Series):
+    def process_statement(self, row: Row):
         self.register_year(row["Date"])
         match row["ActivityCode"]:
             case "DEP" | "WITH":
@@ -467,46 +513,64 @@ class Report:
             case _:
                 self.add_unknown_line(row)
 
+    def ingest_statements(self, df: pd.DataFrame):
+        """
+        Processes all lines of a statement of funds, see process_statement().
+        """
+        for row in rows(df):
+            self.process_statement(row)
+
+    def _add_transaction(self, depot_position: DepotPosition, txn: Transaction):
+        depot_position.add_transaction(txn)
+        if not depot_position.closed:
+            return
+        # A closed position is never continued, the next transaction of the asset opens a new position
+        asset = depot_position.asset
+        open_positions = self._open_positions[asset.asset_class]
+        if open_positions.get(asset.con_id) is depot_position:
+            del open_positions[asset.con_id]
+        if isinstance(depot_position, TreasuryBill):
+            open_treasury_bills = self._open_treasury_bills_by_symbol[asset.symbol]
+            open_treasury_bills[:] = [t_bill for t_bill in open_treasury_bills if t_bill is not depot_position]
+
+    def _get_asset(self, asset: Asset) -> Asset:
+        return self._assets.setdefault(asset, asset)
+
     def _find_stock_position(self, symbol: str, con_id: str, asset_class: str, sub_category: str) -> Stock | None:
-        depot_position = next((stock
-                               for stock in self._stocks
-                               if stock.asset.con_id == con_id and not stock.closed),
-                              None)
+        depot_position = self._open_positions["STK"].get(con_id)
         if depot_position is None:
-            asset = Asset(symbol, con_id, asset_class, sub_category)
+            asset = self._get_asset(Asset(symbol, con_id, asset_class, sub_category))
             new_stock = Stock(asset)
             self._stocks.append(new_stock)
+            self._open_positions["STK"][con_id] = new_stock
             depot_position = new_stock
 
         return depot_position
 
     def _find_option_position(self, symbol: str, con_id: str, asset_class: str) -> Option | None:
-        depot_position = next((option
-                               for option in self._options
-                               if option.asset.con_id == con_id and not option.closed),
-                              None)
+        depot_position = self._open_positions["OPT"].get(con_id)
         if depot_position is None:
-            asset = Asset(symbol, con_id, asset_class)
+            asset = self._get_asset(Asset(symbol, con_id, asset_class))
             new_option = Option(asset)
             self._options.append(new_option)
+            self._open_positions["OPT"][con_id] = new_option
             depot_position = new_option
 
         return depot_position
 
     def _find_treasury_bill_position(self, symbol: str, con_id: str, asset_class: str) -> TreasuryBill | None:
-        depot_position = next((t_bill
-                               for t_bill in self._treasury_bills
-                               if t_bill.asset.con_id == con_id and not t_bill.closed),
-                              None)
+        depot_position = self._open_positions["BILL"].get(con_id)
         if depot_position is None:
-            asset = Asset(symbol, con_id, asset_class)
+            asset = self._get_asset(Asset(symbol, con_id, asset_class))
             new_t_bill = TreasuryBill(asset)
             self._treasury_bills.append(new_t_bill)
+            self._open_positions["BILL"][con_id] = new_t_bill
+            self._open_treasury_bills_by_symbol.setdefault(symbol, []).append(new_t_bill)
             depot_position = new_t_bill
 
         return depot_position
 
-    def process_trade(self, row: pd.Series):
+    def process_trade(self, row: Row):
         self.register_year(row["TradeDate"])
         asset_class = row["AssetClass"]
         if asset_class not in ["STK", "OPT", "BILL", "CASH"]:
@@ -534,7 +598,7 @@ class Report:
         if pd.isna(row["Amount"]):
             # Trade without corresponding entry in statement of funds => Trade without moving any money,
             # e.g. a worthless expired option
-            depot_position.add_transaction(Transaction(
+            self._add_transaction(depot_position, Transaction(
                 trade_id,
                 row["TradeDate"],
                 depot_position.asset,
@@ -547,7 +611,7 @@ class Report:
                 None
             ))
         else:
-            depot_position.add_transaction(Transaction(
+            self._add_transaction(depot_position, Transaction(
                 row["TradeID"],
                 row["Date"],
                 depot_position.asset,
@@ -560,7 +624,14 @@ class Report:
                 row["FXRateToBase_orig"]
             ))
 
-    def process_corporate_action(self, row: pd.Series):
+    def ingest_trades(self, df: pd.DataFrame):
+        """
+        Processes all trades, see process_trade().
+        """
+        for row in rows(df):
+            self.process_trade(row)
+
+    def process_corporate_action(self, row: Row):
         asset_class = row["AssetClass"]
         if asset_class not in ["OPT", "BILL"]:
             raise NotImplementedError()
@@ -579,7 +650,7 @@ class Report:
                 # Handle bill corporate actions in process_trade()
                 return
 
-        depot_position.add_transaction(Transaction(
+        self._add_transaction(depot_position, Transaction(
             None,
             row["Date/Time"],
             depot_position.asset,
@@ -591,3 +662,10 @@ class Report:
             None,
             None
         ))
+
+    def ingest_corporate_actions(self, df: pd.DataFrame):
+        """
+        Processes all corporate actions, see process_corporate_action().
+        """
+        for row in rows(df):
+            self.process_corporate_action(row)
@@ -22,7 +22,7 @@ class AcquisitionType(Enum):
     NON_GENUINE = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     trade_id: str | None
     date: date
@@ -1,17 +1,18 @@
 import dataclasses
-import operator
 from abc import ABC, abstractmethod
 from collections import deque
 from dataclasses import dataclass
+from datetime import date
 from decimal import Decimal
 from enum import Enum, auto
-from functools import reduce
-from typing import Iterable, Self
+from itertools import count
+from typing import Iterable, Iterator, Self, Sequence
 
-from dateutil import relativedelta
+import numpy as np
 
-from money import Money
+from money import Money, MoneyVector
 from transaction import Transaction, OpenCloseIndicator, AcquisitionType
+from transaction_table import TransactionTable
 
 
 class TaxRelevance(Enum):
@@ -19,7 +20,7 @@ class TaxRelevance(Enum):
     TAX_IRRELEVANT = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class TaxableTransaction(Transaction):
     tax_relevance: TaxRelevance = TaxRelevance.TAX_RELEVANT
 
@@ -41,6 +42,130 @@ class TaxableTransaction(Transaction):
         )
 
 
+def _source_field(field_name: str) -> property:
+    return property(lambda view: view._source_value(field_name))
+
+
+def _overridable_field(field_name: str) -> property:
+    slot = f"_{field_name}"
+
+    def get(view):
+        value = getattr(view, slot)
+        return view._source_value(field_name) if value is None else value
+    return property(get)
+
+
+class TaxableTransactionView:
+    """
+    Taxable transaction which refers to a row of a TransactionTable, or to a transaction, instead of copying its
+    fields. Quantity, amounts and exchange rate can be overridden, e.g. for a part of a split opening transaction.
+    It can be used wherever a TaxableTransaction is read, and it is equal to a TaxableTransaction with the same
+    values.
+    """
+    __slots__ = ("_source", "_row", "tax_relevance", "_quantity", "_amount", "_amount_orig", "_fx_rate")
+
+    def __init__(self, transaction: Transaction | Self, tax_relevance: TaxRelevance = TaxRelevance.TAX_RELEVANT,
+                 quantity: Decimal | None = None, amount: Money | None = None, amount_orig: Money | None = None,
+                 fx_rate: Decimal | None = None):
+        """
+        :param transaction: Transaction, or a view, whose source and overrides are taken over
+        :param quantity: Overrides the quantity of the transaction unless None, amount, amount_orig and fx_rate
+                         likewise
+        """
+        if isinstance(transaction, TaxableTransactionView):
+            # Refer to the source, never to a chain of views
+            self._source = transaction._source
+            self._row = transaction._row
+            quantity = transaction._quantity if quantity is None else quantity
+            amount = transaction._amount if amount is None else amount
+            amount_orig = transaction._amount_orig if amount_orig is None else amount_orig
+            fx_rate = transaction._fx_rate if fx_rate is None else fx_rate
+        else:
+            self._source = transaction
+            self._row = None
+        self.tax_relevance = tax_relevance
+        self._quantity = quantity
+        self._amount = amount
+        self._amount_orig = amount_orig
+        self._fx_rate = fx_rate
+
+    @classmethod
+    def of_row(cls, table: TransactionTable, row: int) -> Self:
+        view = cls.__new__(cls)
+        view._source = table
+        view._row = row
+        view.tax_relevance = TaxRelevance.TAX_RELEVANT
+        view._quantity = view._amount = view._amount_orig = view._fx_rate = None
+        return view
+
+    def _source_value(self, field_name: str):
+        if self._row is None:
+            return getattr(self._source, field_name)
+        return self._source.value_at_row(self._row, field_name)
+
+    @property
+    def transaction(self) -> Transaction:
+        if self._row is None:
+            return self._source
+        return self._source.transaction_at_row(self._row)
+
+    def is_overridden(self) -> bool:
+        return not (self._quantity is None and self._amount is None and self._amount_orig is None
+                    and self._fx_rate is None)
+
+    trade_id = _source_field("trade_id")
+    date = _source_field("date")
+    asset = _source_field("asset")
+    activity = _source_field("activity")
+    buy_sell = _source_field("buy_sell")
+    open_close = _source_field("open_close")
+    acquisition = _source_field("acquisition")
+    quantity = _overridable_field("quantity")
+    amount = _overridable_field("amount")
+    amount_orig = _overridable_field("amount_orig")
+    fx_rate = _overridable_field("fx_rate")
+
+    def replace(self, **changes) -> Self:
+        """
+        Returns a view of the same transaction with the given fields changed, like dataclasses.replace().
+        """
+        tax_relevance = changes.pop("tax_relevance", self.tax_relevance)
+        return TaxableTransactionView(self, tax_relevance, **changes)
+
+    def to_taxable_transaction(self) -> TaxableTransaction:
+        return TaxableTransaction(*taxable_transaction_values(self))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (TaxableTransactionView, TaxableTransaction)):
+            return taxable_transaction_values(self) == taxable_transaction_values(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"TaxableTransactionView({self.to_taxable_transaction()!r})"
+
+
+def taxable_transaction_values(transaction: TaxableTransaction | TaxableTransactionView) -> tuple:
+    # In the order of the fields of TaxableTransaction
+    return (transaction.trade_id, transaction.date, transaction.asset, transaction.activity, transaction.buy_sell,
+            transaction.open_close, transaction.quantity, transaction.amount, transaction.amount_orig,
+            transaction.fx_rate, transaction.acquisition, transaction.tax_relevance)
+
+
+def taxable_transaction_views(transactions: Iterable[Transaction],
+                               start: int = 0) -> Iterable[TaxableTransactionView]:
+    """
+    Returns views of the given transactions from the given position on. Rows of a TransactionTable are viewed as they
+    are, no transaction is created.
+    """
+    if isinstance(transactions, TransactionTable):
+        return (TaxableTransactionView.of_row(transactions, row) for row in transactions.rows(start))
+    if start:
+        transactions = transactions[start:]
+    return (TaxableTransactionView(transaction) for transaction in transactions)
+
+
 class TransactionCollection(ABC):
     @abstractmethod
     def profit(self) -> Money:
@@ -84,13 +209,13 @@ class TransactionPair(TransactionCollection):
     def profit(self) -> Money:
         if len(self.opening_transactions) == 0 and self.closing_transaction.amount is not None:
             return self.closing_transaction.amount
-        opening_amount = reduce(operator.add, (txn.amount for txn in self.opening_transactions))
+        opening_amount = Money.sum(txn.amount for txn in self.opening_transactions)
         if self.closing_transaction.amount is None:
             return opening_amount
         return opening_amount + self.closing_transaction.amount
 
     def is_closed(self) -> bool:
-        opening_quantity = reduce(operator.add, (txn.quantity for txn in self.opening_transactions), Decimal(0))
+        opening_quantity = sum((txn.quantity for txn in self.opening_transactions), Decimal(0))
         total_quantity = self.closing_transaction.quantity + opening_quantity
         return total_quantity.is_zero()
 
@@ -102,100 +227,289 @@ class TransactionPair(TransactionCollection):
 
 
 def to_single_transactions(transactions: Iterable[Transaction], year: int) -> list[SingleTransaction]:
-    return [SingleTransaction(TaxableTransaction.from_transaction(transaction, TaxRelevance.TAX_RELEVANT))
-            for transaction in transactions
+    return [SingleTransaction(transaction)
+            for transaction in taxable_transaction_views(transactions)
             if transaction.date.year == year and transaction.amount is not None]
 
 
+def to_single_transactions_by_year(transactions: Iterable[Transaction]) -> dict[int, list[SingleTransaction]]:
+    single_transactions_by_year = dict[int, list[SingleTransaction]]()
+    for transaction in taxable_transaction_views(transactions):
+        if transaction.amount is not None:
+            single_transactions_by_year.setdefault(transaction.date.year, []).append(SingleTransaction(transaction))
+    return single_transactions_by_year
+
+
 def to_opening_closing_pairs(transactions: Iterable[Transaction], year: int) -> list[TransactionPair]:
-    # Build pairs of one (or more) opening transactions and a closing transaction.
-    # A closing transaction can have multiple opening transaction if the quantity does not
-    # match. An opening transaction might get split up into multiple parts to fit into the closing transaction.
-    # The given transactions are processed one by one. If they are sorted by date, they will be processed first-in
-    # first-out (FIFO).
-    transaction_pairs = list[TransactionPair]()
-
-    opening_transactions = deque[Transaction]()
-    closing_transactions = list[Transaction]()
-    for transaction in transactions:
+    return to_opening_closing_pairs_by_year(transactions).get(year, [])
+
+
+def to_opening_closing_pairs_by_year(transactions: Iterable[Transaction]) -> dict[int, list[TransactionPair]]:
+    return group_by_closing_year(stream_opening_closing_pairs(transactions))
+
+
+def group_by_closing_year(transaction_pairs: Iterable[TransactionPair]) -> dict[int, list[TransactionPair]]:
+    transaction_pairs_by_year = dict[int, list[TransactionPair]]()
+    for transaction_pair in transaction_pairs:
+        transaction_pairs_by_year.setdefault(transaction_pair.closing_transaction.date.year, []).append(transaction_pair)
+    return transaction_pairs_by_year
+
+
+@dataclass(frozen=True, slots=True)
+class OpenLot:
+    """
+    Opening transaction, or the remainder of an opening transaction which has been closed in part. Only quantity
+    and amounts are kept, all other fields are taken from the opening transaction.
+    """
+    transaction: TaxableTransactionView
+    quantity: Decimal
+    amount: Money
+    amount_orig: Money
+    is_remainder: bool = False
+
+    @classmethod
+    def of(cls, transaction: TaxableTransactionView) -> Self:
+        return cls(transaction, transaction.quantity, transaction.amount, transaction.amount_orig)
+
+    def _to_taxable_transaction(self, quantity: Decimal, amount: Money,
+                                amount_orig: Money) -> TaxableTransactionView:
+        return TaxableTransactionView(self.transaction, quantity=quantity, amount=amount, amount_orig=amount_orig)
+
+    def close(self, quantity_to_close: Decimal) -> tuple[TaxableTransactionView, Self | None]:
+        """
+        Closes the lot as far as the given quantity of a closing transaction allows.
+
+        :return: The closed part of the lot and the remaining lot, which is None if the lot has been closed completely
+        """
+        if abs(self.quantity) <= abs(quantity_to_close):
+            if not self.is_remainder:
+                # The whole opening transaction
+                return self.transaction, None
+            return self._to_taxable_transaction(self.quantity, self.amount, self.amount_orig), None
+
+        # Lot is too big and cannot match the closing transaction => split it
+        partial_amount_factor = (quantity_to_close / self.quantity).copy_abs()
+        amount_orig_to_close = (self.amount_orig * partial_amount_factor).quantize(Decimal("1.00"))
+        amount_to_close = (self.amount
+                           .with_value(amount_orig_to_close.amount * self.transaction.fx_rate)
+                           .quantize(Decimal("1.00")))
+        remaining_lot = OpenLot(self.transaction,
+                                self.quantity + quantity_to_close,
+                                self.amount - amount_to_close,
+                                self.amount_orig - amount_orig_to_close,
+                                is_remainder=True)
+        return self._to_taxable_transaction(-quantity_to_close, amount_to_close, amount_orig_to_close), remaining_lot
+
+
+class FifoLots:
+    """
+    Open lots and closing transactions which have not been matched completely yet. Transactions are added one by
+    one; each closing transaction is matched with the open lots in the order in which they have been added, after
+    all closing transactions added before it.
+    """
+    def __init__(self, open_lots: Iterable[OpenLot] = ()):
+        self.open_lots = deque[OpenLot](open_lots)
+        self.pending_pairs = deque[TransactionPair]()
+        # Quantity of the first pending pair which has not been matched yet
+        self._quantity_to_close = Decimal(0)
+
+    def is_settled(self) -> bool:
+        """
+        Returns True if all closing transactions have been matched completely, i.e. the state consists of the open
+        lots only.
+        """
+        return not self.pending_pairs
+
+    def add(self, transaction: TaxableTransactionView) -> Iterator[TransactionPair]:
+        """
+        Adds the given transaction and yields the pairs which have been matched completely because of it. The view
+        becomes the closing transaction of a pair, or the opening transaction of pairs as long as it is not split.
+        """
         match transaction.open_close:
             case OpenCloseIndicator.OPEN:
-                opening_transactions.append(transaction)
+                self.open_lots.append(OpenLot.of(transaction))
             case OpenCloseIndicator.CLOSE:
-                closing_transactions.append(transaction)
-
-    for closing_transaction in closing_transactions:
-        transaction_pair = TransactionPair(
-            closing_transaction=TaxableTransaction.from_transaction(closing_transaction, TaxRelevance.TAX_RELEVANT),
-            opening_transactions=[]
-        )
-        quantity_to_close = closing_transaction.quantity
-        while quantity_to_close != 0 and opening_transactions:
-            opening_transaction = opening_transactions.popleft()
-            if abs(opening_transaction.quantity) <= abs(quantity_to_close):
-                transaction_pair.opening_transactions.append(
-                    TaxableTransaction.from_transaction(opening_transaction, TaxRelevance.TAX_RELEVANT)
-                )
-                quantity_to_close += opening_transaction.quantity
-            else:
-                # Opening transaction is too big and cannot match taxable transaction => split it
-                partial_amount_factor = (quantity_to_close / opening_transaction.quantity).copy_abs()
-                amount_orig_to_close = ((opening_transaction.amount_orig * partial_amount_factor)
-                                        .quantize(Decimal("1.00")))
-                amount_to_close = (opening_transaction.amount
-                                   .with_value(amount_orig_to_close.amount * opening_transaction.fx_rate)
-                                   .quantize(Decimal("1.00")))
-                opening_transaction_to_close = dataclasses.replace(
-                    opening_transaction,
-                    quantity=-quantity_to_close,
-                    amount=amount_to_close,
-                    amount_orig=amount_orig_to_close
-                )
-                transaction_pair.opening_transactions.append(
-                    TaxableTransaction.from_transaction(opening_transaction_to_close, TaxRelevance.TAX_RELEVANT)
-                )
-                remaining_opening_transaction = dataclasses.replace(
-                    opening_transaction,
-                    quantity=opening_transaction.quantity + quantity_to_close,
-                    amount=opening_transaction.amount - amount_to_close,
-                    amount_orig=opening_transaction.amount_orig - amount_orig_to_close
-                )
-                opening_transactions.appendleft(remaining_opening_transaction)
-                quantity_to_close = 0
-        transaction_pairs.append(transaction_pair)
-
-    return [transaction_pair
-            for transaction_pair in transaction_pairs
-            if transaction_pair.closing_transaction.date.year == year]
+                if not self.pending_pairs:
+                    self._quantity_to_close = transaction.quantity
+                self.pending_pairs.append(TransactionPair(
+                    closing_transaction=transaction,
+                    opening_transactions=[]
+                ))
+            case _:
+                return
+
+        open_lots = self.open_lots
+        pending_pairs = self.pending_pairs
+        while pending_pairs:
+            if self._quantity_to_close == 0:
+                yield pending_pairs.popleft()
+                if pending_pairs:
+                    self._quantity_to_close = pending_pairs[0].closing_transaction.quantity
+                continue
+            if not open_lots:
+                break
+            closed_part, remaining_lot = open_lots.popleft().close(self._quantity_to_close)
+            if remaining_lot is not None:
+                open_lots.appendleft(remaining_lot)
+            pending_pairs[0].opening_transactions.append(closed_part)
+            self._quantity_to_close += closed_part.quantity
+
+
+def stream_opening_closing_pairs(transactions: Iterable[Transaction]) -> Iterator[TransactionPair]:
+    """
+    Consumes the transactions one by one and yields each pair as soon as its closing transaction has been matched
+    completely, see FifoLots. Pairs are yielded in the order of the closing transactions; pairs which cannot be
+    matched completely are yielded after the last transaction.
+    """
+    fifo_lots = FifoLots()
+    for transaction in taxable_transaction_views(transactions):
+        yield from fifo_lots.add(transaction)
+    yield from fifo_lots.pending_pairs
+
+
+@dataclass(frozen=True, slots=True)
+class FifoCheckpoint:
+    """
+    State of the matching before the transaction at the given position. It is only taken when all closing
+    transactions before have been matched completely, so the open lots are the whole state.
+    """
+    position: int
+    open_lots: tuple[OpenLot, ...]
+    pair_count: int
+
+
+class FifoMatcher:
+    """
+    Builds pairs of one (or more) opening transactions and a closing transaction.
+
+    A closing transaction can have multiple opening transaction if the quantity does not match. An opening
+    transaction might get split up into multiple parts to fit into the closing transaction. The given transactions
+    are processed one by one with FifoLots. If they are sorted by date, they will be processed first-in first-out
+    (FIFO).
+
+    A checkpoint is kept at the start of each year. If only later transactions have been added or changed, matching
+    resumes from the last checkpoint before them, the pairs of the years before are kept.
+    """
+    def __init__(self):
+        self._transaction_pairs: list[TransactionPair] = []
+        self._checkpoints: list[FifoCheckpoint] = []
+
+    def match(self, transactions: Sequence[Transaction], changed_from: int = 0) -> list[TransactionPair]:
+        """
+        Returns the pairs of all closing transactions, in the order of the closing transactions.
+
+        :param transactions: All transactions
+        :param changed_from: Position of the first transaction which has been added or changed since the last call
+        """
+        while self._checkpoints and self._checkpoints[-1].position > changed_from:
+            self._checkpoints.pop()
+        if self._checkpoints:
+            checkpoint = self._checkpoints[-1]
+            start = checkpoint.position
+            fifo_lots = FifoLots(checkpoint.open_lots)
+            del self._transaction_pairs[checkpoint.pair_count:]
+        else:
+            start = 0
+            fifo_lots = FifoLots()
+            self._transaction_pairs.clear()
+
+        if isinstance(transactions, TransactionTable):
+            date_ordinals = transactions.date_ordinals(start)
+        else:
+            date_ordinals = [transaction.date.toordinal() for transaction in transactions[start:]]
+        # Year of the previous transaction, as ordinals of its first and last day
+        year_start = year_end = None
+        for position, transaction, date_ordinal in zip(count(start), taxable_transaction_views(transactions, start),
+                                                       date_ordinals):
+            if year_end is None or not year_start <= date_ordinal <= year_end:
+                if year_end is not None and date_ordinal > year_end and fifo_lots.is_settled():
+                    self._checkpoints.append(FifoCheckpoint(position, tuple(fifo_lots.open_lots),
+                                                            len(self._transaction_pairs)))
+                year = date.fromordinal(date_ordinal).year
+                year_start, year_end = date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+            self._transaction_pairs.extend(fifo_lots.add(transaction))
+        self._transaction_pairs.extend(fifo_lots.pending_pairs)
+
+        return self._transaction_pairs
+
+
+# Ordinal of the epoch of datetime64
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _to_datetime64(dates: Iterable[date]) -> np.ndarray:
+    # Faster than converting date objects with np.array()
+    ordinals = np.fromiter((day.toordinal() for day in dates), dtype=np.int64)
+    return (ordinals - EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def holding_period_exceeded(opening_dates: np.ndarray, closing_dates: np.ndarray) -> np.ndarray:
+    """
+    Returns for each opening date whether its closing date is more than one year later, like
+    opening_date + relativedelta(years=+1) < closing_date: one year after 29 February is 28 February. The dates are
+    arrays of datetime64[D].
+    """
+    months = opening_dates.astype("datetime64[M]")
+    days_of_month = (opening_dates - months.astype("datetime64[D]")).astype(np.int64)
+    next_year_months = months + np.timedelta64(12, "M")
+    next_year_month_starts = next_year_months.astype("datetime64[D]")
+    next_year_month_lengths = ((next_year_months + np.timedelta64(1, "M")).astype("datetime64[D]")
+                               - next_year_month_starts).astype(np.int64)
+    one_year_later = next_year_month_starts + np.minimum(days_of_month, next_year_month_lengths - 1)
+    return one_year_later < closing_dates
+
+
+def _estg_23_closing_tax_relevance(closing_transaction: TaxableTransaction) -> TaxRelevance:
+    match closing_transaction.acquisition:
+        case AcquisitionType.GENUINE:
+            return TaxRelevance.TAX_RELEVANT
+        case AcquisitionType.NON_GENUINE:
+            return TaxRelevance.TAX_IRRELEVANT
+    return closing_transaction.tax_relevance
 
 
 def apply_estg_23(transaction_pairs: list[TransactionPair]) -> list[TransactionPair]:
-
-    def apply_to_opening(opening_transaction: TaxableTransaction, closing_transaction: TaxableTransaction):
-        if (closing_transaction.tax_relevance == TaxRelevance.TAX_IRRELEVANT or
-                opening_transaction.acquisition == AcquisitionType.NON_GENUINE or
-                opening_transaction.date + relativedelta.relativedelta(years=+1) < closing_transaction.date):
-            override_fx_rate = closing_transaction.fx_rate
-            override_amount = (opening_transaction.amount
-                               .with_value(opening_transaction.amount_orig.amount * override_fx_rate)
-                               .quantize(Decimal("1.00")))
-            return dataclasses.replace(opening_transaction,
-                                       amount=override_amount,
-                                       fx_rate=override_fx_rate,
-                                       tax_relevance=TaxRelevance.TAX_IRRELEVANT)
-        return dataclasses.replace(opening_transaction)
-
-
-    def apply(transaction_pair: TransactionPair) -> TransactionPair:
-        result_pair = dataclasses.replace(transaction_pair)
-        match transaction_pair.closing_transaction.acquisition:
-            case AcquisitionType.GENUINE:
-                result_pair.closing_transaction.tax_relevance = TaxRelevance.TAX_RELEVANT
-            case AcquisitionType.NON_GENUINE:
-                result_pair.closing_transaction.tax_relevance = TaxRelevance.TAX_IRRELEVANT
-
-        result_pair.opening_transactions = [apply_to_opening(opening_transaction, result_pair.closing_transaction)
-                                            for opening_transaction in result_pair.opening_transactions]
-        return result_pair
-
-    return [apply(transaction_pair) for transaction_pair in transaction_pairs]
+    """
+    Opening transactions are tax irrelevant if they are not genuine, if they have been held for more than one year,
+    or if their closing transaction is tax irrelevant. Their amount is then converted with the exchange rate of the
+    closing transaction.
+
+    The rules are evaluated for the opening transactions of all pairs at once. The given pairs may be cached and are
+    not changed, unchanged opening transactions are shared with them.
+    """
+    closing_transactions = [TaxableTransactionView(transaction_pair.closing_transaction,
+                                                   _estg_23_closing_tax_relevance(transaction_pair.closing_transaction))
+                            for transaction_pair in transaction_pairs]
+    opening_counts = [len(transaction_pair.opening_transactions) for transaction_pair in transaction_pairs]
+    opening_transactions = [opening_transaction
+                            for transaction_pair in transaction_pairs
+                            for opening_transaction in transaction_pair.opening_transactions]
+
+    pair_indexes = np.repeat(np.arange(len(transaction_pairs)), opening_counts)
+    closing_irrelevant = np.array([closing_transaction.tax_relevance == TaxRelevance.TAX_IRRELEVANT
+                                   for closing_transaction in closing_transactions], dtype=bool)
+    closing_dates = _to_datetime64(closing_transaction.date for closing_transaction in closing_transactions)
+    opening_dates = _to_datetime64(opening_transaction.date for opening_transaction in opening_transactions)
+    non_genuine = np.array([opening_transaction.acquisition == AcquisitionType.NON_GENUINE
+                            for opening_transaction in opening_transactions], dtype=bool)
+    overridden = (closing_irrelevant[pair_indexes] | non_genuine
+                  | holding_period_exceeded(opening_dates, closing_dates[pair_indexes]))
+
+    overridden_indexes = np.flatnonzero(overridden).tolist()
+    override_fx_rates = [closing_transactions[pair_index].fx_rate
+                         for pair_index in pair_indexes[overridden].tolist()]
+    currency = MoneyVector.of(opening_transactions[index].amount for index in overridden_indexes).currency
+    override_amounts = (MoneyVector.of(opening_transactions[index].amount_orig for index in overridden_indexes)
+                        .convert(override_fx_rates, currency)
+                        .quantize(Decimal("1.00")))
+    result_openings = list(opening_transactions)
+    for index, fx_rate, amount in zip(overridden_indexes, override_fx_rates, override_amounts):
+        result_openings[index] = TaxableTransactionView(opening_transactions[index], TaxRelevance.TAX_IRRELEVANT,
+                                                        amount=amount, fx_rate=fx_rate)
+
+    result = []
+    start = 0
+    for closing_transaction, opening_count in zip(closing_transactions, opening_counts):
+        result.append(TransactionPair(closing_transaction, result_openings[start:start + opening_count]))
+        start += opening_count
+    return result
@@ -0,0 +1,371 @@
+from array import array
+from bisect import bisect_left
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Sequence, overload
+
+import numpy as np
+
+from money import Money
+from transaction import Transaction
+
+# Decimals with up to 18 digits fit into an int64 coefficient
+MAX_COEFFICIENT_DIGITS = 18
+# Stands in for the columns of a transaction which is kept as it is
+PLACEHOLDER_TRANSACTION = Transaction(None, date.min, None, None, None, None, Decimal(0), None, None, None)
+POWERS_OF_TEN = np.array([10 ** exponent for exponent in range(MAX_COEFFICIENT_DIGITS + 1)], dtype=np.int64)
+
+
+class PooledColumn:
+    """
+    Values stored as index into a pool of their distinct values, e.g. currency codes, assets or enum members. Values
+    of different types are never pooled together, even if they are equal, e.g. 1 and 1.0.
+    """
+    __slots__ = ("values", "_codes_by_value", "codes")
+
+    def __init__(self, typecode: str = "i"):
+        self.values: list = []
+        self._codes_by_value: dict = {}
+        self.codes = array(typecode)
+
+    def append(self, value):
+        key = (type(value), value)
+        code = self._codes_by_value.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes_by_value[key] = code
+        self.codes.append(code)
+
+    def __getitem__(self, row: int):
+        return self.values[self.codes[row]]
+
+    def code_of(self, value) -> int | None:
+        return self._codes_by_value.get((type(value), value))
+
+    def codes_at(self, rows: np.ndarray) -> np.ndarray:
+        return np.frombuffer(self.codes, dtype=self.codes.typecode)[rows]
+
+
+class DecimalColumn:
+    """
+    Decimals stored as int64 coefficient and exponent, e.g. 1.50 as 150 and -2, so they keep their exponent. Other
+    values (None, NaN, negative zero, Decimals with more digits) are kept as they are.
+    """
+    __slots__ = ("coefficients", "exponents", "other_values")
+
+    def __init__(self):
+        self.coefficients = array("q")
+        self.exponents = array("b")
+        self.other_values: dict[int, Any] = {}
+
+    def append(self, value):
+        if type(value) is Decimal and value.is_finite() and not (value.is_zero() and value.is_signed()):
+            _, digits, exponent = value.as_tuple()
+            if len(digits) <= MAX_COEFFICIENT_DIGITS and -128 <= exponent <= 127:
+                self.coefficients.append(int(value.scaleb(-exponent)))
+                self.exponents.append(exponent)
+                return
+        self.other_values[len(self.coefficients)] = value
+        self.coefficients.append(0)
+        self.exponents.append(0)
+
+    def __getitem__(self, row: int):
+        if self.other_values and row in self.other_values:
+            return self.other_values[row]
+        return Decimal(self.coefficients[row]).scaleb(self.exponents[row])
+
+    def _has_other_values(self, rows: np.ndarray) -> bool:
+        return bool(self.other_values) and not self.other_values.keys().isdisjoint(rows.tolist())
+
+    def decimal_places(self, rows: np.ndarray) -> int | None:
+        """
+        Returns the largest number of decimal places of the values at the given rows, None if one of them is not
+        stored as coefficient and exponent.
+        """
+        if self._has_other_values(rows):
+            return None
+        exponents = np.frombuffer(self.exponents, dtype=np.int8)[rows]
+        return max(0, -int(exponents.min(initial=0)))
+
+    def fixed_point_values(self, rows: np.ndarray, scale: int) -> np.ndarray | None:
+        """
+        Returns the values at the given rows as int64 in units of 10^-scale, e.g. 1.5 as 150 with a scale of 2. Returns
+        None if one of them is not stored as coefficient and exponent, has more decimal places than the scale or does
+        not fit into int64.
+        """
+        if self._has_other_values(rows):
+            return None
+        coefficients = np.frombuffer(self.coefficients, dtype=np.int64)[rows]
+        shifts = np.frombuffer(self.exponents, dtype=np.int8)[rows].astype(np.int64) + scale
+        if np.any(np.abs(shifts) > MAX_COEFFICIENT_DIGITS):
+            return None
+        values = np.empty(len(rows), dtype=np.int64)
+        scaled_down = shifts < 0
+        quotients, remainders = np.divmod(coefficients[scaled_down], POWERS_OF_TEN[-shifts[scaled_down]])
+        if np.any(remainders != 0):
+            return None
+        values[scaled_down] = quotients
+        scaled_up = ~scaled_down
+        powers = POWERS_OF_TEN[shifts[scaled_up]]
+        if np.any(np.abs(coefficients[scaled_up]) > np.iinfo(np.int64).max // powers):
+            return None
+        values[scaled_up] = coefficients[scaled_up] * powers
+        return values
+
+
+class MoneyColumn:
+    __slots__ = ("amounts", "currencies")
+
+    def __init__(self):
+        self.amounts = DecimalColumn()
+        # None if there is no Money at all
+        self.currencies = PooledColumn("h")
+
+    def append(self, money: Money | None):
+        if money is None:
+            self.amounts.append(Decimal(0))
+            self.currencies.append(None)
+        else:
+            self.amounts.append(money.amount)
+            self.currencies.append(money.currency)
+
+    def __getitem__(self, row: int) -> Money | None:
+        currency = self.currencies[row]
+        if currency is None:
+            return None
+        return Money(self.amounts[row], currency)
+
+    def fixed_point_values(self, rows: np.ndarray, scale: int) -> np.ndarray | None:
+        """
+        Returns the amounts at the given rows like DecimalColumn.fixed_point_values(), None if there is no Money at
+        one of the rows.
+        """
+        none_code = self.currencies.code_of(None)
+        if none_code is not None and np.any(self.currencies.codes_at(rows) == none_code):
+            return None
+        return self.amounts.fixed_point_values(rows, scale)
+
+
+class TransactionTable(Sequence[Transaction]):
+    """
+    Transactions stored column by column: dates as ordinals, Decimals and Money as int64 coefficients with their
+    exponent, and trade IDs, assets, currencies and enum members as index into a pool of distinct values. A
+    Transaction object is only created when it is read, and it is equal to the one which has been appended.
+    Transactions of a subclass are kept as they are.
+
+    Each transaction keeps the row it has been appended to, also when the table is sorted. Single fields of a row
+    can be read without creating the transaction, see value_at_row().
+
+    Changing a Transaction after reading it does not change the table.
+
+    With sorted_by_date=True, the transactions are sorted by date before they are read, see sort_by_date(). They are
+    appended as they come and only sorted once they are read after an out-of-order append.
+    """
+    __slots__ = ("_sorted_by_date", "_unsorted", "_order", "_dates", "_trade_ids", "_assets", "_activities",
+                 "_buy_sells", "_open_closes", "_quantities", "_amounts", "_amounts_orig", "_fx_rates",
+                 "_acquisitions", "_other_transactions", "_columns_by_field")
+
+    def __init__(self, transactions: Iterable[Transaction] = (), sorted_by_date: bool = False):
+        self._sorted_by_date = sorted_by_date
+        self._unsorted = False
+        # Rows in the order of the transactions, None as long as it is the order in which they have been appended
+        self._order: array | None = None
+        self._dates = array("i")
+        self._trade_ids = PooledColumn()
+        self._assets = PooledColumn()
+        self._activities: list[str | None] = []
+        self._buy_sells = PooledColumn("b")
+        self._open_closes = PooledColumn("b")
+        self._quantities = DecimalColumn()
+        self._amounts = MoneyColumn()
+        self._amounts_orig = MoneyColumn()
+        self._fx_rates = DecimalColumn()
+        self._acquisitions = PooledColumn("b")
+        self._other_transactions: dict[int, Transaction] = {}
+        self._columns_by_field: dict[str, Any] = {"trade_id": self._trade_ids,
+                                                  "asset": self._assets,
+                                                  "activity": self._activities,
+                                                  "buy_sell": self._buy_sells,
+                                                  "open_close": self._open_closes,
+                                                  "quantity": self._quantities,
+                                                  "amount": self._amounts,
+                                                  "amount_orig": self._amounts_orig,
+                                                  "fx_rate": self._fx_rates,
+                                                  "acquisition": self._acquisitions}
+        for transaction in transactions:
+            self.append(transaction)
+
+    def append(self, transaction: Transaction):
+        row = len(self._dates)
+        if self._sorted_by_date and row and transaction.date.toordinal() < self._dates[self._row(row - 1)]:
+            self._unsorted = True
+        if self._order is not None:
+            self._order.append(row)
+        if type(transaction) is not Transaction or type(transaction.date) is not date:
+            self._other_transactions[row] = transaction
+            self._append_columns(PLACEHOLDER_TRANSACTION)
+            # Keep the date for sorting
+            self._dates[row] = transaction.date.toordinal()
+        else:
+            self._append_columns(transaction)
+
+    def _append_columns(self, transaction: Transaction):
+        self._dates.append(transaction.date.toordinal())
+        self._trade_ids.append(transaction.trade_id)
+        self._assets.append(transaction.asset)
+        self._activities.append(transaction.activity)
+        self._buy_sells.append(transaction.buy_sell)
+        self._open_closes.append(transaction.open_close)
+        self._quantities.append(transaction.quantity)
+        self._amounts.append(transaction.amount)
+        self._amounts_orig.append(transaction.amount_orig)
+        self._fx_rates.append(transaction.fx_rate)
+        self._acquisitions.append(transaction.acquisition)
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def _row(self, position: int) -> int:
+        return position if self._order is None else self._order[position]
+
+    def rows(self, start: int = 0) -> Sequence[int]:
+        """
+        Returns the rows of the transactions from the given position on, in their order.
+        """
+        self._sort_if_needed()
+        if self._order is None:
+            return range(start, len(self))
+        return self._order[start:]
+
+    def date_ordinals(self, start: int = 0) -> list[int]:
+        """
+        Returns the dates of the transactions from the given position on as ordinals, in their order.
+        """
+        return [self._dates[row] for row in self.rows(start)]
+
+    def row_array(self) -> np.ndarray:
+        """
+        Returns the rows of all transactions in their order, see rows().
+        """
+        rows = self.rows()
+        if isinstance(rows, range):
+            return np.arange(rows.start, rows.stop, dtype=np.int64)
+        return np.frombuffer(rows, dtype=np.int32).astype(np.int64)
+
+    def _has_other_transactions(self, rows: np.ndarray) -> bool:
+        return bool(self._other_transactions) and not self._other_transactions.keys().isdisjoint(rows.tolist())
+
+    def value_mask(self, field_name: str, value, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns for each of the given rows whether a field with pooled values, e.g. open_close, equals the value. The
+        transactions at the rows must not be of a subclass, see fixed_point_values().
+        """
+        code = self._columns_by_field[field_name].code_of(value)
+        if code is None:
+            return np.zeros(len(rows), dtype=bool)
+        return self._columns_by_field[field_name].codes_at(rows) == code
+
+    def decimal_places(self, field_name: str, rows: np.ndarray) -> int | None:
+        """
+        Returns the largest number of decimal places of a Decimal field at the given rows, see
+        DecimalColumn.decimal_places().
+        """
+        if self._has_other_transactions(rows):
+            return None
+        return self._columns_by_field[field_name].decimal_places(rows)
+
+    def fixed_point_values(self, field_name: str, scale: int, rows: np.ndarray) -> np.ndarray | None:
+        """
+        Returns a Decimal or Money field at the given rows as int64 in units of 10^-scale, without creating the
+        transactions. Returns None if a transaction at the rows is of a subclass, or if a value cannot be converted
+        exactly, see DecimalColumn.fixed_point_values().
+        """
+        if self._has_other_transactions(rows):
+            return None
+        return self._columns_by_field[field_name].fixed_point_values(rows, scale)
+
+    def transaction_at_row(self, row: int) -> Transaction:
+        if self._other_transactions and row in self._other_transactions:
+            return self._other_transactions[row]
+        return Transaction(self._trade_ids[row],
+                           date.fromordinal(self._dates[row]),
+                           self._assets[row],
+                           self._activities[row],
+                           self._buy_sells[row],
+                           self._open_closes[row],
+                           self._quantities[row],
+                           self._amounts[row],
+                           self._amounts_orig[row],
+                           self._fx_rates[row],
+                           self._acquisitions[row])
+
+    def value_at_row(self, row: int, field_name: str):
+        """
+        Returns a single field of the transaction at the given row, without creating the transaction.
+        """
+        if self._other_transactions and row in self._other_transactions:
+            return getattr(self._other_transactions[row], field_name)
+        if field_name == "date":
+            return date.fromordinal(self._dates[row])
+        return self._columns_by_field[field_name][row]
+
+    @overload
+    def __getitem__(self, index: int) -> Transaction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Transaction]: ...
+
+    def __getitem__(self, index):
+        self._sort_if_needed()
+        if isinstance(index, slice):
+            return [self.transaction_at_row(self._row(position))
+                    for position in range(*index.indices(len(self)))]
+        position = index + len(self) if index < 0 else index
+        if not 0 <= position < len(self):
+            raise IndexError("transaction index out of range")
+        return self.transaction_at_row(self._row(position))
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for row in self.rows():
+            yield self.transaction_at_row(row)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (TransactionTable, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TransactionTable({list(self)!r})"
+
+    def last_date(self) -> date:
+        self._sort_if_needed()
+        return date.fromordinal(self._dates[self._row(len(self) - 1)])
+
+    def _sort_if_needed(self):
+        if self._unsorted:
+            self.sort_by_date()
+            self._unsorted = False
+
+    def sort_by_date(self):
+        """
+        Sorts the transactions by date. Stable, transactions of the same date keep their order. The transactions keep
+        their rows.
+        """
+        self._order = array("i", sorted(range(len(self)) if self._order is None else self._order,
+                                        key=self._dates.__getitem__))
+
+    def in_year(self, year: int) -> list[Transaction]:
+        """
+        Returns the transactions of the given year, in their order. Only these transactions are created.
+        """
+        start, end = date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+        return [self.transaction_at_row(row) for row in self.rows() if start <= self._dates[row] <= end]
+
+    def first_index_from(self, from_date: date) -> int:
+        """
+        Returns the position of the first transaction on or after the given date. The table must be sorted by date.
+        """
+        self._sort_if_needed()
+        return bisect_left(range(len(self)), from_date.toordinal(),
+                           key=lambda position: self._dates[self._row(position)])
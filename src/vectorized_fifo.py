@@ -0,0 +1,121 @@
+from decimal import Decimal
+from typing import Sequence
+
+import numpy as np
+
+from money import Money
+from transaction import Transaction, OpenCloseIndicator
+from transaction_collection import TransactionPair, TaxableTransactionView, stream_opening_closing_pairs
+from transaction_table import TransactionTable
+
+# Flows of foreign currency accounts are quantized to cents
+AMOUNT_SCALE = 2
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def _money(cents: int, currency: str) -> Money:
+    return Money(Decimal(cents).scaleb(-AMOUNT_SCALE), currency)
+
+
+def _divide_round_half_even(numerators: np.ndarray, denominator: int) -> np.ndarray:
+    quotients, remainders = np.divmod(numerators, denominator)
+    round_up = (2 * remainders > denominator) | ((2 * remainders == denominator) & (quotients % 2 == 1))
+    return quotients + round_up
+
+
+def match_fifo_vectorized(transactions: Sequence[Transaction]) -> list[TransactionPair]:
+    """
+    Builds the same pairs as FifoMatcher for the flows of a foreign currency account, but computes which opening
+    transactions are matched by which closing transaction, and the amounts of split opening transactions, with
+    array operations on the columns of a TransactionTable instead of one transaction after the other.
+
+    Quantities and amounts must be in cents, the quantity of a flow equals its original amount. The scalar matcher
+    is used if they are not, or if the amounts cannot be computed exactly with int64.
+    """
+    table = transactions if isinstance(transactions, TransactionTable) else TransactionTable(transactions)
+    rows = table.row_array()
+    quantities = table.fixed_point_values("quantity", AMOUNT_SCALE, rows)
+    if quantities is None:
+        return list(stream_opening_closing_pairs(table))
+    is_opening = table.value_mask("open_close", OpenCloseIndicator.OPEN, rows)
+    is_closing = table.value_mask("open_close", OpenCloseIndicator.CLOSE, rows)
+    if not is_closing.any():
+        return []
+    opening_rows = rows[is_opening]
+    closing_rows = rows[is_closing]
+    opening_quantities = quantities[is_opening]
+    closing_quantities = -quantities[is_closing]
+    opening_amounts_orig = table.fixed_point_values("amount_orig", AMOUNT_SCALE, opening_rows)
+    opening_amounts = table.fixed_point_values("amount", AMOUNT_SCALE, opening_rows)
+    fx_rate_scale = table.decimal_places("fx_rate", opening_rows)
+    if opening_amounts_orig is None or opening_amounts is None or fx_rate_scale is None:
+        return list(stream_opening_closing_pairs(table))
+    scaled_fx_rates = table.fixed_point_values("fx_rate", fx_rate_scale, opening_rows)
+    if (scaled_fx_rates is None or np.any(opening_amounts_orig != opening_quantities)
+            or np.any(opening_quantities < 0) or np.any(closing_quantities <= 0)
+            or sum(opening_quantities.tolist()) > INT64_MAX or sum(closing_quantities.tolist()) > INT64_MAX
+            or sum(np.abs(opening_amounts).tolist()) > INT64_MAX
+            or (max(opening_quantities.tolist(), default=0) * max(np.abs(scaled_fx_rates).tolist(), default=0)
+                > INT64_MAX)):
+        return list(stream_opening_closing_pairs(table))
+
+    # Both kinds of flows are laid out on one axis of cumulative quantities, each overlap of an opening and a
+    # closing transaction becomes a part of the opening transaction matched by the closing transaction
+    opening_ends = np.cumsum(opening_quantities)
+    closing_ends = np.cumsum(closing_quantities)
+    matched_quantity = min(int(opening_ends[-1]) if len(opening_rows) else 0, int(closing_ends[-1]))
+    boundaries = np.unique(np.concatenate(([0], opening_ends, closing_ends)))
+    boundaries = boundaries[boundaries <= matched_quantity]
+    part_starts = boundaries[:-1]
+    part_quantities = np.diff(boundaries)
+    part_openings = np.searchsorted(opening_ends, part_starts, side="right")
+    part_closings = np.searchsorted(closing_ends, part_starts, side="right")
+
+    # Openings without quantity are matched by the closing transaction which is active at their position
+    empty_openings = np.flatnonzero(opening_quantities == 0)
+    empty_opening_closings = np.searchsorted(closing_ends, opening_ends[empty_openings], side="right")
+    matched = empty_opening_closings < len(closing_rows)
+    empty_openings = empty_openings[matched]
+    empty_opening_closings = empty_opening_closings[matched]
+    part_openings = np.concatenate((part_openings, empty_openings))
+    part_closings = np.concatenate((part_closings, empty_opening_closings))
+    part_quantities = np.concatenate((part_quantities, np.zeros(len(empty_openings), dtype=np.int64)))
+    part_ends = np.concatenate((boundaries[1:], opening_ends[empty_openings]))
+    order = np.lexsort((part_openings, part_closings))
+    part_openings = part_openings[order]
+    part_closings = part_closings[order]
+    part_quantities = part_quantities[order]
+    part_ends = part_ends[order]
+
+    # A part ending before its opening transaction ends splits the opening transaction, its amount is converted
+    # with the exchange rate of the opening transaction, like OpenLot.close(); the last part gets the remaining amount
+    split = part_ends < opening_ends[part_openings]
+    part_amounts = np.zeros(len(part_openings), dtype=np.int64)
+    part_amounts[split] = _divide_round_half_even(part_quantities[split] * scaled_fx_rates[part_openings[split]],
+                                                  10 ** fx_rate_scale)
+    split_amounts = np.zeros(len(opening_rows), dtype=np.int64)
+    np.add.at(split_amounts, part_openings[split], part_amounts[split])
+    last = ~split
+    part_amounts[last] = opening_amounts[part_openings[last]] - split_amounts[part_openings[last]]
+    opening_starts = opening_ends - opening_quantities
+    whole = last & (part_quantities == opening_quantities[part_openings]) & (part_ends - part_quantities ==
+                                                                             opening_starts[part_openings])
+
+    transaction_pairs = [TransactionPair(TaxableTransactionView.of_row(table, row), [])
+                         for row in closing_rows.tolist()]
+    opening_views = {}
+    for opening_index, closing_index, quantity, amount, is_whole in zip(part_openings.tolist(),
+                                                                        part_closings.tolist(),
+                                                                        part_quantities.tolist(),
+                                                                        part_amounts.tolist(),
+                                                                        whole.tolist()):
+        opening = opening_views.get(opening_index)
+        if opening is None:
+            opening = TaxableTransactionView.of_row(table, int(opening_rows[opening_index]))
+            opening_views[opening_index] = opening
+        if not is_whole:
+            amount_orig = _money(quantity, opening.amount_orig.currency)
+            opening = TaxableTransactionView(opening, quantity=amount_orig.amount,
+                                             amount=_money(amount, opening.amount.currency), amount_orig=amount_orig)
+        transaction_pairs[closing_index].opening_transactions.append(opening)
+    return transaction_pairs
@@ -425,5 +425,40 @@ class DepotPositionTests(unittest.TestCase):
                                              Decimal(1))],
                          transaction_collections[0].get_opening_transactions())
 
+    def test_transactions_are_sorted_by_date_keeping_the_order_of_the_same_date(self):
+        asset = Asset("XXX", "ConID", "STK")
+        depot_position = DepotPosition(asset)
+        for trade_id, day in [("1", 24), ("2", 23), ("3", 24), ("4", 23)]:
+            depot_position.add_transaction(Transaction(trade_id,
+                                                       datetime.date(2024, 12, day),
+                                                       asset,
+                                                       None,
+                                                       BuySell.BUY,
+                                                       OpenCloseIndicator.OPEN,
+                                                       Decimal(1),
+                                                       None,
+                                                       None,
+                                                       None))
+
+        self.assertEqual(["2", "4", "1", "3"], [txn.trade_id for txn in depot_position.transactions])
+
+    def test_position_is_closed_when_no_quantity_remains(self):
+        asset = Asset("XXX", "ConID", "STK")
+        depot_position = DepotPosition(asset)
+        for quantity in [100, 50, -150]:
+            self.assertFalse(depot_position.closed)
+            depot_position.add_transaction(Transaction(None,
+                                                       datetime.date(2024, 12, 24),
+                                                       asset,
+                                                       None,
+                                                       BuySell.BUY if quantity > 0 else BuySell.SELL,
+                                                       OpenCloseIndicator.OPEN if quantity > 0 else OpenCloseIndicator.CLOSE,
+                                                       Decimal(quantity),
+                                                       None,
+                                                       None,
+                                                       None))
+
+        self.assertTrue(depot_position.closed)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from distinct_values import map_distinct
+
+
+class MapDistinctTests(unittest.TestCase):
+    def test_each_distinct_value_is_converted_once(self):
+        values = pd.Series(["a", None, "b", "a", np.nan], name="letters", index=[5, 6, 7, 8, 9])
+        converted = []
+
+        def convert(uniques):
+            converted.extend(uniques)
+            return [value.upper() for value in uniques]
+
+        result = map_distinct(values, convert)
+
+        self.assertEqual(["a", "b"], converted)
+        self.assertEqual(["A", None, "B", "A", None], result.tolist())
+        self.assertEqual("letters", result.name)
+        self.assertEqual([5, 6, 7, 8, 9], result.index.tolist())
+
+    def test_missing_value_and_dtype(self):
+        result = map_distinct(pd.Series([1.5, None, 1.5]), lambda uniques: [int(value * 2) for value in uniques],
+                              pd.NA, "Int64")
+
+        self.assertEqual("Int64", result.dtype)
+        self.assertEqual([3, pd.NA, 3], result.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import glob
+import unittest
+from decimal import Decimal
+
+import pandas as pd
+
+from depot_position import DepotPositionType
+from fixed_point import fixed_point_from_decimal, decimal_from_fixed_point, fixed_point_from_decimals, \
+    decimals_from_fixed_point
+from flex_query import convert_decimals
+from report import Result
+from testutils import read_report, comparable
+
+
+class FixedPointTests(unittest.TestCase):
+    def test_fixed_point_from_decimal(self):
+        self.assertEqual(-442451910000, fixed_point_from_decimal(Decimal("-4424.5191"), 8))
+        self.assertEqual(500200000000, fixed_point_from_decimal(Decimal("5002"), 8))
+        self.assertEqual(1, fixed_point_from_decimal(Decimal("0.00000001"), 8))
+
+    def test_fixed_point_from_decimal_with_too_many_decimal_places(self):
+        with self.assertRaises(ValueError):
+            fixed_point_from_decimal(Decimal("0.000000001"), 8)
+
+    def test_decimal_from_fixed_point(self):
+        self.assertEqual("-4424.5191", str(decimal_from_fixed_point(-442451910000, 8)))
+        self.assertEqual("5002", str(decimal_from_fixed_point(500200000000, 8)))
+        self.assertEqual("100", str(decimal_from_fixed_point(10000000000, 8)))
+        self.assertEqual("0", str(decimal_from_fixed_point(0, 8)))
+
+    def test_columns_round_trip(self):
+        values = pd.Series([Decimal("1.5"), None, Decimal("-2.25"), Decimal("1.5")], dtype=object)
+
+        fixed_points = fixed_point_from_decimals(values, 2)
+
+        self.assertEqual("Int64", fixed_points.dtype)
+        self.assertEqual([150, pd.NA, -225, 150], fixed_points.tolist())
+        self.assertEqual([Decimal("1.5"), None, Decimal("-2.25"), Decimal("1.5")],
+                         decimals_from_fixed_point(fixed_points, 2).tolist())
+
+    def test_only_summed_columns_are_converted(self):
+        df = pd.DataFrame({"TradePrice": ["1.1234567891"], "Amount": ["-11.2345678912"], "TradeCommission": ["-1.5"]})
+
+        convert_decimals(df, fixed_point=True)
+
+        self.assertEqual([Decimal("1.1234567891")], df["TradePrice"].tolist())
+        # Amount has more decimal places than its scale, so it stays Decimal
+        self.assertEqual([Decimal("-11.2345678912")], df["Amount"].tolist())
+        self.assertEqual("Int64", df["TradeCommission"].dtype)
+        self.assertEqual([-1500000000], df["TradeCommission"].tolist())
+
+    def test_result_totals(self):
+        result = Result(2024, pd.DataFrame({"profit": [Decimal("1.10"), None, Decimal("-0.25"), Decimal("2.00")]}))
+
+        self.assertEqual(Decimal("2.85"), result.total("profit"))
+        self.assertEqual(Decimal("3.10"), result.total_positive("profit"))
+        self.assertEqual(Decimal("-0.25"), result.total_negative("profit"))
+
+    def test_result_totals_with_more_decimal_places(self):
+        result = Result(2024, pd.DataFrame({"profit": [Decimal("1.1234567891"), None, Decimal("-0.25")]}))
+
+        self.assertEqual(Decimal("0.8734567891"), result.total("profit"))
+        self.assertEqual(Decimal("1.1234567891"), result.total_positive("profit"))
+        self.assertEqual(Decimal("-0.25"), result.total_negative("profit"))
+
+    def test_empty_result_totals(self):
+        result = Result(2024, pd.DataFrame(columns=["profit"]))
+
+        self.assertEqual(Decimal(0), result.total("profit"))
+        self.assertEqual(Decimal(0), result.total_positive("profit"))
+        self.assertEqual(Decimal(0), result.total_negative("profit"))
+
+
+class FixedPointParityTests(unittest.TestCase):
+    def test_same_report_as_decimal_path(self):
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            with self.subTest(filename=filename):
+                decimal_report = read_report(filename)
+                fixed_point_report = read_report(filename, fixed_point=True)
+
+                self.assertEqual(comparable(decimal_report), comparable(fixed_point_report))
+                for year in map(int, fixed_point_report.get_years()):
+                    results = [fixed_point_report.get_deposits(year),
+                               fixed_point_report.get_interests(year),
+                               fixed_point_report.get_dividends(year),
+                               fixed_point_report.get_stocks(year, DepotPositionType.LONG),
+                               fixed_point_report.get_options(year, DepotPositionType.SHORT),
+                               fixed_point_report.get_treasury_bills(year),
+                               *fixed_point_report.get_foreign_currencies(year, False).values()]
+                    for result in results:
+                        column = "profit" if "profit" in result.df.columns else "amount"
+                        data = result.df[column].dropna()
+                        self.assertEqual(data[data >= 0].sum(), result.total_positive(column))
+                        self.assertEqual(data[data < 0].sum(), result.total_negative(column))
+
+
+if __name__ == '__main__':
+    unittest.main()
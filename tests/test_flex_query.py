@@ -0,0 +1,161 @@
+import datetime
+import glob
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+
+from flex_query import FlexQueryFileIndex, read_csv_part, decimal_from_value, DECIMAL_COLUMNS, \
+    STATEMENT_OF_FUNDS_SECTION_CODE, STATEMENT_OF_FUNDS_COLUMNS, TRADES_COLUMNS_SECTION_CODE, \
+    TRADES_COLUMNS, CORPORATE_ACTIONS_SECTION_CODE, CORPORATE_ACTIONS_COLUMNS, forex_fx_rates, dates_from_strings, \
+    read_statement_of_funds, read_trades, read_corporate_actions, split_section
+from testutils import read_report, comparable
+
+SECTIONS = [(STATEMENT_OF_FUNDS_SECTION_CODE, STATEMENT_OF_FUNDS_COLUMNS),
+            (TRADES_COLUMNS_SECTION_CODE, TRADES_COLUMNS),
+            (CORPORATE_ACTIONS_SECTION_CODE, CORPORATE_ACTIONS_COLUMNS)]
+
+
+class FlexQueryFileIndexTests(unittest.TestCase):
+    CONTENT = (b'"BOF","U1234567","Report"\n'
+               b'"HEADER","STFU","Amount"\n'
+               b'"DATA","STFU","1"\n'
+               b'"HEADER","TRNT","Quantity"\n'
+               b'"DATA","TRNT","2"\n'
+               b'"DATA","STFU","3"\n'
+               b'"EOF","U1234567"\n')
+
+    def test_byte_ranges_of_sections(self):
+        index = FlexQueryFileIndex(self.CONTENT)
+
+        self.assertEqual(["STFU", "TRNT"], index.section_codes())
+        self.assertEqual([(26, 69), (114, 132)], index.ranges("STFU"))
+        self.assertEqual([(69, 114)], index.ranges("TRNT"))
+        self.assertEqual([], index.ranges("CORP"))
+
+    def test_sections_are_read_from_their_byte_ranges(self):
+        index = FlexQueryFileIndex(self.CONTENT)
+
+        self.assertEqual(b'"HEADER","STFU","Amount"\n"DATA","STFU","1"\n"DATA","STFU","3"\n',
+                         index.open("STFU").read())
+        self.assertEqual(b'"HEADER","TRNT","Quantity"\n"DATA","TRNT","2"\n', index.open("TRNT").read())
+        self.assertEqual(b'', index.open("CORP").read())
+
+    def test_last_line_without_line_break(self):
+        index = FlexQueryFileIndex(b'"HEADER","STFU","Amount"\n"DATA","STFU","1"')
+
+        self.assertEqual(b'"HEADER","STFU","Amount"\n"DATA","STFU","1"', index.open("STFU").read())
+
+    def test_same_sections_as_line_by_line_split(self):
+        with open("resources/options/short_close.csv", "rb") as csv_file:
+            content = csv_file.read()
+        index = FlexQueryFileIndex(content)
+        lines = content.decode("utf-8").splitlines(keepends=True)
+
+        self.assertEqual(["STFU", "TRNT"], index.section_codes())
+        for section_code in index.section_codes():
+            section_lines = [line for line in lines
+                             if line.startswith((f'"HEADER","{section_code}",', f'"DATA","{section_code}",'))]
+            self.assertEqual("".join(section_lines), index.open(section_code).read().decode("utf-8"))
+
+
+class DecimalConversionTests(unittest.TestCase):
+    def test_same_decimals_as_converters(self):
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            with FlexQueryFileIndex.from_file(filename) as sections:
+                for section_code, required_columns in SECTIONS:
+                    with self.subTest(filename=filename, section_code=section_code):
+                        decimal_columns = [col for col in DECIMAL_COLUMNS if col in required_columns]
+                        try:
+                            expected = pd.read_csv(sections.open(section_code),
+                                                   usecols=decimal_columns,
+                                                   converters={col: decimal_from_value for col in decimal_columns})
+                        except EmptyDataError:
+                            continue
+                        actual = read_csv_part(sections, section_code, required_columns)
+
+                        for col in decimal_columns:
+                            self.assertEqual([repr(value) for value in expected[col]],
+                                             [repr(value) for value in actual[col]])
+
+
+class ForexFxRateTests(unittest.TestCase):
+    def test_forex_fx_rates(self):
+        amounts = pd.Series([Decimal("-10015.809655"), Decimal("900")])
+        amounts_orig = pd.Series([Decimal("10371.5"), Decimal("-1000")])
+
+        self.assertEqual([Decimal("0.96571"), Decimal("0.90000")], forex_fx_rates(amounts, amounts_orig, False))
+
+    def test_forex_fx_rates_of_fixed_point_amounts(self):
+        amounts = pd.Series([-10015809655000, 900000000000], dtype="Int64")
+        amounts_orig = pd.Series([10371500000000, -1000000000000], dtype="Int64")
+
+        self.assertEqual([Decimal("0.96571"), Decimal("0.90000")], forex_fx_rates(amounts, amounts_orig, True))
+
+
+class DateConversionTests(unittest.TestCase):
+    def test_dates_from_strings(self):
+        values = pd.Series(["20220318", None, "20220318;162000", " ", "20240229"], dtype=object)
+
+        self.assertEqual([datetime.date(2022, 3, 18), None, datetime.date(2022, 3, 18), None,
+                          datetime.date(2024, 2, 29)],
+                         dates_from_strings(values).tolist())
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            dates_from_strings(pd.Series(["2022-03-18"], dtype=object))
+
+
+class PyarrowEngineParityTests(unittest.TestCase):
+    def test_same_data_frames_as_c_engine(self):
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            with FlexQueryFileIndex.from_file(filename) as sections:
+                for read in [read_statement_of_funds, read_trades, read_corporate_actions]:
+                    with self.subTest(filename=filename, read=read.__name__):
+                        pd.testing.assert_frame_equal(read(filename, sections, engine="c"),
+                                                      read(filename, sections, engine="pyarrow"))
+
+    def test_same_report_as_c_engine(self):
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            with self.subTest(filename=filename):
+                self.assertEqual(comparable(read_report(filename, engine="c")),
+                                 comparable(read_report(filename, engine="pyarrow")))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            read_csv_part(FlexQueryFileIndex(b""), STATEMENT_OF_FUNDS_SECTION_CODE, STATEMENT_OF_FUNDS_COLUMNS,
+                          engine="python")
+
+
+class ShardedSectionTests(unittest.TestCase):
+    SECTION = b'"HEADER","STFU","Amount"\n"DATA","STFU","1"\n"DATA","STFU","2"\n"DATA","STFU","3"\n'
+
+    def test_split_section_at_line_boundaries(self):
+        self.assertEqual([b'"HEADER","STFU","Amount"\n"DATA","STFU","1"\n',
+                          b'"HEADER","STFU","Amount"\n"DATA","STFU","2"\n',
+                          b'"HEADER","STFU","Amount"\n"DATA","STFU","3"\n'],
+                         split_section(self.SECTION, 3))
+
+    def test_split_section_into_more_shards_than_lines(self):
+        self.assertEqual(3, len(split_section(self.SECTION, 10)))
+        self.assertEqual(b"".join(part.split(b"\n", 1)[1] for part in split_section(self.SECTION, 10)),
+                         self.SECTION.split(b"\n", 1)[1])
+
+    def test_split_section_without_data(self):
+        self.assertEqual([b'"HEADER","STFU","Amount"\n'], split_section(b'"HEADER","STFU","Amount"\n', 3))
+        self.assertEqual([b""], split_section(b"", 3))
+
+    @patch("flex_query.MIN_SHARD_BYTES", 1)
+    def test_same_data_frame_as_single_read(self):
+        with FlexQueryFileIndex.from_file("resources/options/short_split.csv") as sections:
+            for fixed_point in [False, True]:
+                with self.subTest(fixed_point=fixed_point):
+                    pd.testing.assert_frame_equal(read_statement_of_funds("short_split.csv", sections, fixed_point),
+                                                  read_statement_of_funds("short_split.csv", sections, fixed_point,
+                                                                          shards=3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,15 @@
 import datetime
+import glob
+import random
 import unittest
 from decimal import Decimal
 
 from foreign_currency_account import ForeignCurrencyAccount
 from money import Money
 from transaction import Transaction, BuySell, OpenCloseIndicator, AcquisitionType
-from transaction_collection import TaxableTransaction, apply_estg_23
+from transaction_collection import TaxableTransaction, apply_estg_23, TaxRelevance, FifoMatcher
+from testutils import read_report
+from vectorized_fifo import match_fifo_vectorized
 
 
 class DepotPositionCurrencyTests(unittest.TestCase):
@@ -752,5 +756,121 @@ class DepotPositionCurrencyTests(unittest.TestCase):
         self.assertEqual(Money(Decimal("-0.82"), "EUR"), -transaction_pairs[3].profit())
 
 
+    def test_transaction_pairs_are_rebuilt_after_adding_a_transaction(self):
+        account = ForeignCurrencyAccount("USD")
+        account.add_transaction(Transaction(None, datetime.date(2023, 12, 24), None, None, BuySell.BUY,
+                                            OpenCloseIndicator.OPEN, Decimal(10), Money(Decimal(9), "EUR"),
+                                            Money(Decimal(10), "USD"), Decimal("0.9"),
+                                            AcquisitionType.NON_GENUINE))
+        account.add_transaction(Transaction(None, datetime.date(2024, 1, 2), None, None, BuySell.SELL,
+                                            OpenCloseIndicator.CLOSE, Decimal(-4), Money(Decimal("-3.2"), "EUR"),
+                                            Money(Decimal(-4), "USD"), Decimal("0.8"),
+                                            AcquisitionType.NON_GENUINE))
+        self.assertEqual(0, len(account.transaction_pairs(2023)))
+        self.assertEqual(1, len(account.transaction_pairs(2024)))
+        self.assertEqual(0, len(account.transaction_pairs(2025)))
+
+        account.add_transaction(Transaction(None, datetime.date(2025, 1, 2), None, None, BuySell.SELL,
+                                            OpenCloseIndicator.CLOSE, Decimal(-6), Money(Decimal("-4.2"), "EUR"),
+                                            Money(Decimal(-6), "USD"), Decimal("0.7")))
+
+        self.assertEqual(1, len(account.transaction_pairs(2024)))
+        self.assertEqual(1, len(account.transaction_pairs(2025)))
+        self.assertEqual([Decimal(6)], [txn.quantity for txn in account.transaction_pairs(2025)[0].opening_transactions])
+
+    def test_apply_estg_23_does_not_change_the_transaction_pairs_of_the_account(self):
+        account = ForeignCurrencyAccount("USD")
+        account.add_transaction(Transaction(None, datetime.date(2024, 1, 2), None, None, BuySell.BUY,
+                                            OpenCloseIndicator.OPEN, Decimal(10), Money(Decimal(9), "EUR"),
+                                            Money(Decimal(10), "USD"), Decimal("0.9")))
+        account.add_transaction(Transaction(None, datetime.date(2024, 2, 1), None, None, BuySell.SELL,
+                                            OpenCloseIndicator.CLOSE, Decimal(-10), Money(Decimal(-8), "EUR"),
+                                            Money(Decimal(-10), "USD"), Decimal("0.8"),
+                                            AcquisitionType.NON_GENUINE))
+
+        apply_estg_23(account.transaction_pairs(2024))
+
+        self.assertEqual(TaxRelevance.TAX_RELEVANT, account.transaction_pairs(2024)[0].closing_transaction.tax_relevance)
+
+    def test_estg_23_transaction_pairs_are_kept_until_a_transaction_is_added(self):
+        account = ForeignCurrencyAccount("USD")
+        account.add_transaction(Transaction(None, datetime.date(2024, 1, 2), None, None, BuySell.BUY,
+                                            OpenCloseIndicator.OPEN, Decimal(10), Money(Decimal(9), "EUR"),
+                                            Money(Decimal(10), "USD"), Decimal("0.9")))
+        account.add_transaction(Transaction(None, datetime.date(2024, 2, 1), None, None, BuySell.SELL,
+                                            OpenCloseIndicator.CLOSE, Decimal(-4), Money(Decimal("-3.2"), "EUR"),
+                                            Money(Decimal(-4), "USD"), Decimal("0.8")))
+        transaction_pairs = account.estg_23_transaction_pairs(2024)
+
+        self.assertEqual(apply_estg_23(account.transaction_pairs(2024)), transaction_pairs)
+        self.assertIs(transaction_pairs[0], account.estg_23_transaction_pairs(2024)[0])
+
+        account.add_transaction(Transaction(None, datetime.date(2024, 3, 1), None, None, BuySell.SELL,
+                                            OpenCloseIndicator.CLOSE, Decimal(-6), Money(Decimal("-4.2"), "EUR"),
+                                            Money(Decimal(-6), "USD"), Decimal("0.7")))
+
+        self.assertEqual(2, len(account.estg_23_transaction_pairs(2024)))
+
+
+
+def currency_flow(day: int, amount_orig: Decimal, fx_rate: Decimal) -> Transaction:
+    is_inflow = amount_orig >= 0
+    return Transaction(f"Trade ID #{day}",
+                       datetime.date(2023, 1, 1) + datetime.timedelta(days=day),
+                       None,
+                       None,
+                       BuySell.BUY if is_inflow else BuySell.SELL,
+                       OpenCloseIndicator.OPEN if is_inflow else OpenCloseIndicator.CLOSE,
+                       amount_orig,
+                       Money((amount_orig * fx_rate).quantize(Decimal("1.00")), "EUR"),
+                       Money(amount_orig, "USD"),
+                       fx_rate)
+
+
+class VectorizedFifoTests(unittest.TestCase):
+    def test_same_pairs_as_loop_for_test_resources(self):
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            report = read_report(filename)
+            for currency, account in report._foreign_currency_accounts.items():
+                with self.subTest(filename=filename, currency=currency):
+                    self.assertEqual(FifoMatcher().match(account.transactions),
+                                     match_fifo_vectorized(account.transactions))
+
+    def test_same_pairs_as_loop_for_random_flows(self):
+        randomizer = random.Random(23)
+        transactions = []
+        for day in range(2000):
+            amount_orig = Decimal(randomizer.randint(-50000, 60000)).scaleb(-2)
+            if randomizer.random() < 0.02:
+                amount_orig = Decimal("0.00")
+            fx_rate = Decimal(randomizer.randint(800000, 1000000)).scaleb(-6)
+            transactions.append(currency_flow(day, amount_orig, fx_rate))
+        for count in [0, 1, 10, 100, 2000]:
+            with self.subTest(count=count):
+                account = ForeignCurrencyAccount("USD")
+                vectorized_account = ForeignCurrencyAccount("USD", vectorized=True)
+                for transaction in transactions[:count]:
+                    account.add_transaction(transaction)
+                    vectorized_account.add_transaction(transaction)
+                for year in [2023, 2024, 2025, 2026, 2027, 2028]:
+                    self.assertEqual(account.transaction_pairs(year), vectorized_account.transaction_pairs(year))
+
+    def test_split_amount_is_rounded_half_even(self):
+        transactions = [currency_flow(0, Decimal("10.00"), Decimal("0.5")),
+                        currency_flow(1, Decimal("-0.05"), Decimal("0.5")),
+                        currency_flow(2, Decimal("-0.07"), Decimal("0.5"))]
+
+        transaction_pairs = match_fifo_vectorized(transactions)
+
+        self.assertEqual([Money(Decimal("0.02"), "EUR"), Money(Decimal("0.04"), "EUR")],
+                         [pair.opening_transactions[0].amount for pair in transaction_pairs])
+
+    def test_falls_back_to_loop_for_fractions_of_cents(self):
+        transactions = [currency_flow(0, Decimal("1.005"), Decimal("0.9")),
+                        currency_flow(1, Decimal("-0.5"), Decimal("0.9"))]
+
+        self.assertEqual(FifoMatcher().match(transactions), match_fifo_vectorized(transactions))
+
+
 if __name__ == '__main__':
     unittest.main()
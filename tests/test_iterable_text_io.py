@@ -0,0 +1,44 @@
+import unittest
+
+import pandas as pd
+
+from iterable_text_io import IterableTextIO
+
+
+class IterableTextIOTests(unittest.TestCase):
+    def test_read_joins_strings_up_to_size(self):
+        text_io = IterableTextIO(["a,b\n", "1,2\n", "3,4\n"])
+
+        self.assertEqual("a,b\n1,", text_io.read(6))
+        self.assertEqual("2\n3,4\n", text_io.read(100))
+        self.assertEqual("", text_io.read(100))
+
+    def test_read_all(self):
+        text_io = IterableTextIO(["a,b\n", "1,2\n"])
+
+        self.assertEqual("a,b\n1,2\n", text_io.read())
+        self.assertEqual("", text_io.read())
+
+    def test_readline(self):
+        text_io = IterableTextIO(["a,b\n1,", "2\n", "3,4"])
+
+        self.assertEqual("a,b\n", text_io.readline())
+        self.assertEqual("1,", text_io.readline(2))
+        self.assertEqual("2\n", text_io.readline())
+        self.assertEqual("3,4", text_io.readline())
+        self.assertEqual("", text_io.readline())
+
+    def test_iterate_lines(self):
+        text_io = IterableTextIO(["a,b\n1,", "2\n"])
+
+        self.assertEqual(["a,b\n", "1,2\n"], list(text_io))
+
+    def test_read_csv(self):
+        df = pd.read_csv(IterableTextIO(["a,b\n", "1,2\n", "3,4\n"]))
+
+        self.assertEqual([1, 3], df["a"].tolist())
+        self.assertEqual([2, 4], df["b"].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 from decimal import Decimal
 
-from money import Money, CurrencyMismatchError
+from money import Money, CurrencyMismatchError, MoneyVector
 
 
 class MoneyTests(unittest.TestCase):
@@ -157,6 +157,53 @@ class MoneyTests(unittest.TestCase):
         self.assertEqual(Money(Decimal("10.00"), "EUR"), money_to_test)
         self.assertEqual(-2, money_to_test.amount.as_tuple().exponent)
 
+    def test_sum(self):
+        result = Money.sum(Money(Decimal(amount), "EUR") for amount in ["1.5", "2.25", "-0.75"])
+
+        self.assertEqual(Money(Decimal("3.00"), "EUR"), result)
+
+    def test_sum_of_different_currencies(self):
+        with self.assertRaises(CurrencyMismatchError):
+            Money.sum([Money(Decimal(1), "EUR"), Money(Decimal(1), "USD")])
+
+    def test_sum_of_nothing(self):
+        with self.assertRaises(ValueError):
+            Money.sum([])
+
+    def test_sum_of_no_money(self):
+        with self.assertRaises(TypeError):
+            Money.sum([Money(Decimal(1), "EUR"), Decimal(1)])
+
+
+class MoneyVectorTests(unittest.TestCase):
+    def test_of(self):
+        vector = MoneyVector.of([Money(Decimal(1), "EUR"), Money(Decimal(2), "EUR")])
+
+        self.assertEqual(MoneyVector([Decimal(1), Decimal(2)], "EUR"), vector)
+        self.assertEqual([Money(Decimal(1), "EUR"), Money(Decimal(2), "EUR")], list(vector))
+
+    def test_of_different_currencies(self):
+        with self.assertRaises(CurrencyMismatchError):
+            MoneyVector.of([Money(Decimal(1), "EUR"), Money(Decimal(1), "USD")])
+
+    def test_of_nothing(self):
+        vector = MoneyVector.of([])
+
+        self.assertEqual(0, len(vector))
+        self.assertIsNone(vector.currency)
+
+    def test_arithmetic(self):
+        vector = MoneyVector([Decimal("1.005"), Decimal("-2.5")], "USD")
+
+        self.assertEqual(MoneyVector([Decimal("-1.005"), Decimal("2.5")], "USD"), -vector)
+        self.assertEqual(MoneyVector([Decimal("1.00"), Decimal("-2.50")], "USD"), vector.quantize(Decimal("1.00")))
+        self.assertEqual(MoneyVector([Decimal("2.010"), Decimal("-1.25")], "EUR"),
+                         vector.convert([Decimal(2), Decimal("0.5")], "EUR"))
+
+    def test_convert_with_missing_fx_rates(self):
+        with self.assertRaises(ValueError):
+            MoneyVector([Decimal(1), Decimal(2)], "USD").convert([Decimal(2)], "EUR")
+
 
 if __name__ == '__main__':
     unittest.main()
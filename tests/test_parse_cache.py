@@ -0,0 +1,83 @@
+import glob
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from flex_query import read_flex_query
+from parse_cache import ParseCache, FORMAT_VERSION, CACHE_SUBDIRECTORY
+
+
+def read_file(filename: str) -> bytes:
+    with open(filename, "rb") as file:
+        return file.read()
+
+
+class ParseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_same_data_frames_as_parsed(self):
+        cache = ParseCache(self.directory.name)
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            content = read_file(filename)
+            frames = read_flex_query(filename, content)
+            cache.put(content, frames)
+            with self.subTest(filename=filename):
+                for expected, actual in zip(frames, cache.get(content)):
+                    pd.testing.assert_frame_equal(expected, actual)
+
+    def test_unknown_content(self):
+        cache = ParseCache(self.directory.name)
+
+        self.assertIsNone(cache.get(b"unknown"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        contents = [read_file("resources/stock/buy_long_unclosed.csv"),
+                    read_file("resources/stock/assign_long_close.csv"),
+                    read_file("resources/stock/execute_assign.csv")]
+        cache = ParseCache(self.directory.name)
+        for content in contents[:2]:
+            cache.put(content, read_flex_query("test.csv", content))
+        entries = sorted(os.scandir(cache.directory), key=lambda entry: entry.name)
+        for age, entry in enumerate(entries):
+            os.utime(entry.path, (age, age))
+        entry_size = max(sum(file.stat().st_size for file in os.scandir(entry.path)) for entry in entries)
+        cache.max_bytes = 2 * entry_size + entry_size // 2
+        # Reading marks the oldest entry as recently used, so the other one is evicted
+        oldest_content = next(content for content in contents[:2] if cache._entry_path(content) == entries[0].path)
+        self.assertIsNotNone(cache.get(oldest_content))
+
+        cache.put(contents[2], read_flex_query("test.csv", contents[2]))
+
+        self.assertIsNotNone(cache.get(oldest_content))
+        self.assertIsNotNone(cache.get(contents[2]))
+        self.assertEqual(2, len(os.listdir(cache.directory)))
+
+    def test_entries_of_other_format_versions_are_removed(self):
+        old_entry = os.path.join(self.directory.name, CACHE_SUBDIRECTORY, f"v{FORMAT_VERSION - 1}", "entry")
+        os.makedirs(old_entry)
+
+        ParseCache(self.directory.name)
+
+        self.assertEqual([f"v{FORMAT_VERSION}"], os.listdir(os.path.join(self.directory.name, CACHE_SUBDIRECTORY)))
+
+    def test_other_directories_are_kept(self):
+        for name in ["venv", "videos", f"v{FORMAT_VERSION - 1}", os.path.join(CACHE_SUBDIRECTORY, "videos")]:
+            os.makedirs(os.path.join(self.directory.name, name))
+            with open(os.path.join(self.directory.name, name, "file.txt"), "w") as file:
+                file.write(name)
+
+        ParseCache(self.directory.name)
+
+        self.assertEqual([f"v{FORMAT_VERSION}", "videos"],
+                         sorted(os.listdir(os.path.join(self.directory.name, CACHE_SUBDIRECTORY))))
+        for name in ["venv", "videos", f"v{FORMAT_VERSION - 1}", os.path.join(CACHE_SUBDIRECTORY, "videos")]:
+            with self.subTest(name=name):
+                self.assertTrue(os.path.isfile(os.path.join(self.directory.name, name, "file.txt")))
+
+
+if __name__ == '__main__':
+    unittest.main()
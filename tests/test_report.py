@@ -0,0 +1,73 @@
+import glob
+import unittest
+from datetime import date
+from decimal import Decimal
+
+import pandas as pd
+
+from flex_query import read_flex_query, FlexQueryFileIndex, read_corporate_actions
+from report import Report, rows
+from testutils import comparable
+
+
+class IngestTests(unittest.TestCase):
+    def test_rows(self):
+        df = pd.DataFrame({"Symbol": ["BAC", None], "AssetClass": pd.Categorical(["STK", None])})
+
+        self.assertEqual([{"Symbol": "BAC", "AssetClass": "STK"}, {"Symbol": None, "AssetClass": None}],
+                         comparable(list(rows(df))))
+
+    def test_same_report_as_row_series(self):
+        for filename in sorted(glob.glob("resources/**/*.csv", recursive=True)):
+            with open(filename, "rb") as file:
+                df_trades, df_statement_of_funds, _ = read_flex_query(filename, file.read())
+            with FlexQueryFileIndex.from_file(filename) as sections:
+                df_corporate_actions = read_corporate_actions(filename, sections)
+            expected = Report()
+            df_trades.apply(lambda row: expected.process_trade(row), axis=1)
+            df_statement_of_funds.apply(lambda row: expected.process_statement(row), axis=1)
+            df_corporate_actions.apply(lambda row: expected.process_corporate_action(row), axis=1)
+
+            actual = Report()
+            actual.ingest_trades(df_trades)
+            actual.ingest_statements(df_statement_of_funds)
+            actual.ingest_corporate_actions(df_corporate_actions)
+
+            with self.subTest(filename=filename):
+                self.assertEqual(comparable(expected), comparable(actual))
+
+
+def stock_trade(trade_id: str, trade_date: date, buy_sell: str, open_close: str, quantity: int) -> dict:
+    return {"TradeDate": trade_date, "AssetClass": "STK", "Symbol": "GAB", "Conid": "395298055", "TradeID": trade_id,
+            "Buy/Sell": buy_sell, "Open/CloseIndicator": open_close, "Quantity": Decimal(quantity),
+            "SubCategory": "COMMON", "Date": trade_date, "ActivityDescription": f"{buy_sell} {quantity} GAB",
+            "TradeQuantity": Decimal(quantity), "Amount": Decimal(-10 * quantity), "CurrencyPrimary": "EUR",
+            "Amount_orig": Decimal(-11 * quantity), "CurrencyPrimary_orig": "USD",
+            "FXRateToBase_orig": Decimal("0.9")}
+
+
+class OpenPositionTests(unittest.TestCase):
+    def test_closed_position_is_reopened_as_new_position(self):
+        report = Report()
+        report.process_trade(stock_trade("1", date(2022, 1, 3), "BUY", "O", 100))
+        report.process_trade(stock_trade("2", date(2022, 2, 1), "BUY", "O", 50))
+        report.process_trade(stock_trade("3", date(2022, 3, 1), "SELL", "C", -150))
+        report.process_trade(stock_trade("4", date(2022, 4, 1), "BUY", "O", 20))
+
+        self.assertEqual(2, len(report._stocks))
+        self.assertTrue(report._stocks[0].closed)
+        self.assertEqual(["1", "2", "3"], [txn.trade_id for txn in report._stocks[0].transactions])
+        self.assertFalse(report._stocks[1].closed)
+        self.assertEqual(["4"], [txn.trade_id for txn in report._stocks[1].transactions])
+
+    def test_positions_of_the_same_asset_share_the_asset(self):
+        report = Report()
+        report.process_trade(stock_trade("1", date(2022, 1, 3), "BUY", "O", 100))
+        report.process_trade(stock_trade("2", date(2022, 3, 1), "SELL", "C", -100))
+        report.process_trade(stock_trade("3", date(2022, 4, 1), "BUY", "O", 20))
+
+        self.assertIs(report._stocks[0].asset, report._stocks[1].asset)
+
+
+if __name__ == '__main__':
+    unittest.main()
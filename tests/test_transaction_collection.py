@@ -1,11 +1,18 @@
 import datetime
+import pickle
 import unittest
 from decimal import Decimal
 
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
 from money import Money
 from transaction import Transaction, BuySell, OpenCloseIndicator, AcquisitionType
 from transaction_collection import TaxableTransaction, TaxRelevance, SingleTransaction, to_single_transactions, \
-    TransactionPair, to_opening_closing_pairs
+    TransactionPair, to_opening_closing_pairs, to_opening_closing_pairs_by_year, FifoMatcher, \
+    group_by_closing_year, stream_opening_closing_pairs, TaxableTransactionView, holding_period_exceeded, \
+    apply_estg_23
+from transaction_table import TransactionTable
 
 
 class TransactionCollectionTest(unittest.TestCase):
@@ -581,5 +588,215 @@ class TransactionCollectionTest(unittest.TestCase):
         )
 
 
+def fifo_transaction(trade_id: int, date: datetime.date, quantity: int) -> Transaction:
+    buy_sell = BuySell.BUY if quantity > 0 else BuySell.SELL
+    open_close = OpenCloseIndicator.OPEN if quantity > 0 else OpenCloseIndicator.CLOSE
+    return Transaction(f"Trade ID #{trade_id}", date, None, "Activity", buy_sell, open_close, Decimal(quantity),
+                       Money(Decimal(-quantity), "EUR"), Money(Decimal(-quantity), "USD"), Decimal("0.9"))
+
+
+class FifoMatcherTest(unittest.TestCase):
+    def setUp(self):
+        # The opening transaction of 2023 is split across 2023 and 2024, the closing transaction of 2025 is matched
+        # only partially
+        self.transactions = [
+            fifo_transaction(1, datetime.date(2023, 1, 1), 3),
+            fifo_transaction(2, datetime.date(2023, 6, 1), -1),
+            fifo_transaction(3, datetime.date(2024, 1, 1), 5),
+            fifo_transaction(4, datetime.date(2024, 6, 1), -4),
+            fifo_transaction(5, datetime.date(2025, 6, 1), -5),
+        ]
+
+    def test_matching_added_transactions_equals_matching_all_transactions(self):
+        for count in range(len(self.transactions)):
+            with self.subTest(count=count):
+                matcher = FifoMatcher()
+                matcher.match(self.transactions[:count])
+
+                transaction_pairs = matcher.match(self.transactions, count)
+
+                self.assertEqual(to_opening_closing_pairs_by_year(self.transactions),
+                                 group_by_closing_year(transaction_pairs))
+
+    def test_closing_transaction_pending_across_years(self):
+        # The closing transaction of 2023 is matched only in 2024, there is no checkpoint at the start of 2024
+        transactions = [fifo_transaction(1, datetime.date(2023, 6, 1), -2),
+                        fifo_transaction(2, datetime.date(2024, 1, 1), 1),
+                        fifo_transaction(3, datetime.date(2025, 1, 1), 3),
+                        fifo_transaction(4, datetime.date(2025, 6, 1), -1)]
+        for count in range(len(transactions)):
+            with self.subTest(count=count):
+                matcher = FifoMatcher()
+                matcher.match(transactions[:count])
+
+                transaction_pairs = matcher.match(transactions, count)
+
+                self.assertEqual(list(stream_opening_closing_pairs(transactions)), transaction_pairs)
+                self.assertEqual([Decimal(1), Decimal(1)],
+                                 [txn.quantity for txn in transaction_pairs[0].opening_transactions])
+
+    def test_pairs_of_earlier_years_are_kept(self):
+        matcher = FifoMatcher()
+        pairs_2023 = matcher.match(self.transactions[:4])[0]
+
+        transaction_pairs = matcher.match(self.transactions + [fifo_transaction(6, datetime.date(2025, 7, 1), 1)],
+                                          len(self.transactions))
+
+        self.assertIs(pairs_2023, transaction_pairs[0])
+        self.assertEqual(3, len(transaction_pairs))
+
+    def test_opening_transaction_added_after_all_were_matched(self):
+        matcher = FifoMatcher()
+        matcher.match(self.transactions)
+        transactions = self.transactions + [fifo_transaction(6, datetime.date(2025, 7, 1), 1)]
+
+        transaction_pairs = matcher.match(transactions, len(self.transactions))
+
+        # The closing transaction of 2025 could only be matched partially before
+        self.assertEqual(to_opening_closing_pairs(transactions, 2025), transaction_pairs[2:])
+        self.assertEqual(2, len(transaction_pairs[2].opening_transactions))
+
+
+class StreamOpeningClosingPairsTest(unittest.TestCase):
+    def test_same_pairs_as_fifo_matcher(self):
+        transactions = [
+            # Closing transaction before any opening transaction
+            fifo_transaction(1, datetime.date(2023, 1, 1), -1),
+            fifo_transaction(2, datetime.date(2023, 2, 1), 3),
+            fifo_transaction(3, datetime.date(2023, 6, 1), -1),
+            fifo_transaction(4, datetime.date(2024, 1, 1), 5),
+            fifo_transaction(5, datetime.date(2024, 6, 1), -4),
+            fifo_transaction(6, datetime.date(2025, 6, 1), -5),
+            fifo_transaction(7, datetime.date(2025, 7, 1), -1),
+        ]
+        for count in range(len(transactions) + 1):
+            with self.subTest(count=count):
+                self.assertEqual(FifoMatcher().match(transactions[:count]),
+                                 list(stream_opening_closing_pairs(transactions[:count])))
+
+    def test_pair_is_yielded_as_soon_as_it_is_matched(self):
+        transactions = iter([
+            fifo_transaction(1, datetime.date(2025, 1, 1), 2),
+            fifo_transaction(2, datetime.date(2025, 2, 1), -1),
+            fifo_transaction(3, datetime.date(2025, 3, 1), -2),
+        ])
+
+        transaction_pairs = stream_opening_closing_pairs(transactions)
+
+        self.assertEqual("Trade ID #2", next(transaction_pairs).closing_transaction.trade_id)
+        self.assertEqual("Trade ID #3", next(transactions).trade_id)
+        self.assertEqual([], list(transaction_pairs))
+
+    def test_split_lot_keeps_fields_of_opening_transaction(self):
+        transactions = [
+            fifo_transaction(1, datetime.date(2025, 1, 1), 3),
+            fifo_transaction(2, datetime.date(2025, 2, 1), -1),
+            fifo_transaction(3, datetime.date(2025, 3, 1), -2),
+        ]
+
+        transaction_pairs = list(stream_opening_closing_pairs(transactions))
+
+        self.assertEqual([Decimal(1), Decimal(2)],
+                         [pair.opening_transactions[0].quantity for pair in transaction_pairs])
+        self.assertEqual([Money(Decimal("-1.00"), "USD"), Money(Decimal("-2.00"), "USD")],
+                         [pair.opening_transactions[0].amount_orig for pair in transaction_pairs])
+        for transaction_pair in transaction_pairs:
+            self.assertEqual("Trade ID #1", transaction_pair.opening_transactions[0].trade_id)
+            self.assertTrue(transaction_pair.is_closed())
+
+
+class TaxableTransactionViewTest(unittest.TestCase):
+    def setUp(self):
+        self.transaction = fifo_transaction(1, datetime.date(2025, 1, 1), 3)
+
+    def test_equals_taxable_transaction(self):
+        view = TaxableTransactionView(self.transaction, TaxRelevance.TAX_IRRELEVANT)
+
+        self.assertEqual(TaxableTransaction.from_transaction(self.transaction, TaxRelevance.TAX_IRRELEVANT), view)
+        self.assertEqual(view, TaxableTransaction.from_transaction(self.transaction, TaxRelevance.TAX_IRRELEVANT))
+        self.assertNotEqual(TaxableTransaction.from_transaction(self.transaction, TaxRelevance.TAX_RELEVANT), view)
+        self.assertNotEqual(self.transaction, view)
+
+    def test_overrides_do_not_change_the_transaction(self):
+        view = TaxableTransactionView(self.transaction, quantity=Decimal(1), amount=Money(Decimal("-1.00"), "EUR"))
+
+        changed_view = view.replace(fx_rate=Decimal("0.8"), tax_relevance=TaxRelevance.TAX_IRRELEVANT)
+
+        self.assertEqual(
+            TaxableTransaction("Trade ID #1", datetime.date(2025, 1, 1), None, "Activity", BuySell.BUY,
+                               OpenCloseIndicator.OPEN, Decimal(1), Money(Decimal("-1.00"), "EUR"),
+                               Money(Decimal(-3), "USD"), Decimal("0.8"), AcquisitionType.GENUINE,
+                               TaxRelevance.TAX_IRRELEVANT),
+            changed_view.to_taxable_transaction())
+        self.assertIs(self.transaction, changed_view.transaction)
+        self.assertEqual(Decimal("0.9"), view.fx_rate)
+        self.assertEqual(Decimal(3), self.transaction.quantity)
+        with self.assertRaises(TypeError):
+            view.replace(date=datetime.date(2025, 1, 2))
+
+    def test_pickle(self):
+        view = TaxableTransactionView(self.transaction, quantity=Decimal(1))
+
+        self.assertEqual(view, pickle.loads(pickle.dumps(view)))
+
+    def test_view_of_table_row(self):
+        table = TransactionTable([self.transaction, fifo_transaction(2, datetime.date(2025, 2, 1), -1)])
+
+        transaction_pair = FifoMatcher().match(table)[0]
+
+        self.assertEqual(TaxableTransaction.from_transaction(table[1], TaxRelevance.TAX_RELEVANT),
+                         transaction_pair.closing_transaction)
+        self.assertEqual(Decimal(1), transaction_pair.opening_transactions[0].quantity)
+        self.assertEqual(Decimal(3), transaction_pair.opening_transactions[0].transaction.quantity)
+        self.assertEqual(transaction_pair, pickle.loads(pickle.dumps(transaction_pair)))
+
+    def test_matched_pairs_refer_to_the_transactions(self):
+        transactions = [self.transaction, fifo_transaction(2, datetime.date(2025, 2, 1), -3)]
+
+        transaction_pair = to_opening_closing_pairs(transactions, 2025)[0]
+
+        self.assertIs(transactions[0], transaction_pair.opening_transactions[0].transaction)
+        self.assertIs(transactions[1], transaction_pair.closing_transaction.transaction)
+
+
+class ApplyEstg23Test(unittest.TestCase):
+    def test_holding_period_exceeded_equals_relativedelta(self):
+        opening_dates = [datetime.date(2023, 12, 31) + datetime.timedelta(days=day) for day in range(0, 800, 3)]
+        opening_dates += [datetime.date(2024, 2, 29), datetime.date(2000, 2, 29), datetime.date(2023, 2, 28)]
+        for days_held in [364, 365, 366, 367]:
+            with self.subTest(days_held=days_held):
+                closing_dates = [opening_date + datetime.timedelta(days=days_held) for opening_date in opening_dates]
+
+                exceeded = holding_period_exceeded(np.array(opening_dates, dtype="datetime64[D]"),
+                                                   np.array(closing_dates, dtype="datetime64[D]"))
+
+                self.assertEqual([opening_date + relativedelta(years=+1) < closing_date
+                                  for opening_date, closing_date in zip(opening_dates, closing_dates)],
+                                 exceeded.tolist())
+
+    def test_one_year_after_29_february_is_28_february(self):
+        transactions = [fifo_transaction(1, datetime.date(2024, 2, 29), 1),
+                        fifo_transaction(2, datetime.date(2024, 2, 29), 1),
+                        fifo_transaction(3, datetime.date(2025, 2, 28), -1),
+                        fifo_transaction(4, datetime.date(2025, 3, 1), -1)]
+
+        transaction_pairs = apply_estg_23(to_opening_closing_pairs(transactions, 2025))
+
+        self.assertEqual([TaxRelevance.TAX_RELEVANT, TaxRelevance.TAX_IRRELEVANT],
+                         [pair.opening_transactions[0].tax_relevance for pair in transaction_pairs])
+
+    def test_unchanged_opening_transactions_are_shared(self):
+        transactions = [fifo_transaction(1, datetime.date(2025, 1, 1), 2),
+                        fifo_transaction(2, datetime.date(2025, 2, 1), -1),
+                        fifo_transaction(3, datetime.date(2025, 3, 1), 1)]
+        transaction_pairs = to_opening_closing_pairs(transactions, 2025)
+
+        estg_23_transaction_pairs = apply_estg_23(transaction_pairs)
+
+        self.assertIs(transaction_pairs[0].opening_transactions[0],
+                      estg_23_transaction_pairs[0].opening_transactions[0])
+        self.assertEqual([], apply_estg_23([]))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+import datetime
+import math
+import pickle
+import unittest
+from decimal import Decimal
+
+from Asset import Asset
+from money import Money
+from transaction import Transaction, BuySell, OpenCloseIndicator, AcquisitionType
+from transaction_collection import TaxableTransaction, TaxRelevance
+from transaction_table import TransactionTable
+
+ASSET = Asset("BAC", "15124833", "STK", "COMMON")
+
+
+def transaction(trade_id: str | None, date: datetime.date, quantity: Decimal, amount: Money | None = None,
+                fx_rate=Decimal("0.9")) -> Transaction:
+    return Transaction(trade_id, date, ASSET, f"Buy {quantity} BAC", BuySell.BUY, OpenCloseIndicator.OPEN, quantity,
+                       amount, Money(Decimal("-11.00"), "USD"), fx_rate, AcquisitionType.NON_GENUINE)
+
+
+class TransactionTableTest(unittest.TestCase):
+    def test_transactions_are_read_as_appended(self):
+        transactions = [
+            transaction("1", datetime.date(2024, 1, 2), Decimal("100"), Money(Decimal("-9.90"), "EUR")),
+            transaction(None, datetime.date(2024, 1, 3), Decimal("0.0001"), None),
+            transaction("3", datetime.date(2024, 1, 4), Decimal("1E+2"), Money(Decimal("-0.00"), "EUR")),
+            transaction("4", datetime.date(2024, 1, 5), Decimal("1234567890.1234567890123"),
+                        Money(Decimal("-1.5"), "EUR"), math.nan),
+            TaxableTransaction.from_transaction(transaction("5", datetime.date(2024, 1, 6), Decimal(1)),
+                                                TaxRelevance.TAX_RELEVANT),
+        ]
+
+        table = TransactionTable(transactions)
+
+        self.assertEqual(len(transactions), len(table))
+        self.assertEqual(transactions[:4], table[:4])
+        self.assertIs(transactions[4], table[4])
+        self.assertTrue(math.isnan(table[3].fx_rate))
+        for expected, actual in zip(transactions[:4], table):
+            with self.subTest(trade_id=expected.trade_id):
+                # Decimals keep their exponent
+                self.assertEqual(str(expected.quantity), str(actual.quantity))
+                self.assertEqual(str(expected.amount), str(actual.amount))
+
+    def test_values_of_different_types_are_not_pooled(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 1, 2), Decimal(1)),
+                                  transaction(1, datetime.date(2024, 1, 2), Decimal(1))])
+
+        self.assertEqual(["1", 1], [txn.trade_id for txn in table])
+        self.assertEqual(int, type(table[1].trade_id))
+
+    def test_sort_by_date_is_stable(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 3, 1), Decimal(1)),
+                                  transaction("2", datetime.date(2024, 1, 1), Decimal("-0")),
+                                  transaction("3", datetime.date(2024, 3, 1), Decimal(3)),
+                                  transaction("4", datetime.date(2024, 2, 1), Decimal(4))])
+
+        table.sort_by_date()
+
+        self.assertEqual(["2", "4", "1", "3"], [txn.trade_id for txn in table])
+        self.assertEqual("-0", str(table[0].quantity))
+        self.assertEqual(datetime.date(2024, 3, 1), table.last_date())
+        self.assertEqual(2, table.first_index_from(datetime.date(2024, 2, 2)))
+
+    def test_sorted_by_date_when_read(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 3, 1), Decimal(1))], sorted_by_date=True)
+        table.append(transaction("2", datetime.date(2024, 1, 1), Decimal(2)))
+        table.append(transaction("3", datetime.date(2024, 3, 1), Decimal(3)))
+
+        self.assertEqual(datetime.date(2024, 3, 1), table.last_date())
+        self.assertEqual(["2", "1", "3"], [txn.trade_id for txn in table])
+
+    def test_rows_are_kept_when_sorted(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 3, 1), Decimal(1)),
+                                  transaction("2", datetime.date(2024, 1, 1), Decimal(2))])
+
+        table.sort_by_date()
+        table.append(transaction("3", datetime.date(2024, 2, 1), Decimal(3)))
+        table.sort_by_date()
+
+        self.assertEqual([1, 2, 0], list(table.rows()))
+        self.assertEqual("1", table.transaction_at_row(0).trade_id)
+        self.assertEqual(Decimal(3), table.value_at_row(2, "quantity"))
+        self.assertEqual(datetime.date(2024, 2, 1), table.value_at_row(2, "date"))
+
+    def test_in_year(self):
+        table = TransactionTable([transaction("1", datetime.date(2023, 12, 31), Decimal(1)),
+                                  transaction("2", datetime.date(2024, 1, 1), Decimal(2)),
+                                  transaction("3", datetime.date(2024, 12, 31), Decimal(3)),
+                                  transaction("4", datetime.date(2025, 1, 1), Decimal(4))])
+
+        self.assertEqual(["2", "3"], [txn.trade_id for txn in table.in_year(2024)])
+
+    def test_pickle(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 1, 2), Decimal(1))])
+
+        self.assertEqual(table, pickle.loads(pickle.dumps(table)))
+
+    def test_columns_as_arrays(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 3, 1), Decimal("1.5")),
+                                  transaction("2", datetime.date(2024, 1, 1), Decimal(-2), fx_rate=Decimal("0.875")),
+                                  transaction("3", datetime.date(2024, 2, 1), Decimal("0.25"))])
+        table.sort_by_date()
+        rows = table.row_array()
+
+        self.assertEqual([1, 2, 0], rows.tolist())
+        self.assertEqual([-200, 25, 150], table.fixed_point_values("quantity", 2, rows).tolist())
+        self.assertEqual([-1100, -1100, -1100], table.fixed_point_values("amount_orig", 2, rows).tolist())
+        self.assertEqual(3, table.decimal_places("fx_rate", rows))
+        self.assertEqual([True, True, True], table.value_mask("open_close", OpenCloseIndicator.OPEN, rows).tolist())
+        self.assertEqual([False, False, False],
+                         table.value_mask("open_close", OpenCloseIndicator.CLOSE, rows).tolist())
+
+    def test_columns_which_cannot_be_arrays(self):
+        table = TransactionTable([transaction("1", datetime.date(2024, 1, 1), Decimal("1.005")),
+                                  transaction("2", datetime.date(2024, 1, 2), Decimal(1), fx_rate=None)])
+        rows = table.row_array()
+
+        # More decimal places than the scale, no Money, no Decimal
+        self.assertIsNone(table.fixed_point_values("quantity", 2, rows))
+        self.assertIsNone(table.fixed_point_values("amount", 2, rows))
+        self.assertIsNone(table.decimal_places("fx_rate", rows))
+        self.assertEqual([1005], table.fixed_point_values("quantity", 3, rows[:1]).tolist())
+        self.assertIsNone(TransactionTable([transaction("1", datetime.date(2024, 1, 1), Decimal(10) ** 17)])
+                          .fixed_point_values("quantity", 2, rows[:1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,19 @@
-import io
+import dataclasses
+import math
 
 import pandas as pd
 
-from flex_query import read_statement_of_funds, read_trades, read_corporate_actions
+from fixed_point import convert_fixed_point_to_decimals
+from flex_query import read_statement_of_funds, read_trades, read_corporate_actions, FlexQueryFileIndex
 from report import Report
+from transaction_table import TransactionTable
 
 
-def read_report(filename: str) -> Report:
-    with open(filename, encoding="utf-8") as csv_file:
-        data_file_content = csv_file.read()
-        df_statement_of_funds = read_statement_of_funds(filename, io.StringIO(data_file_content))
-        df_trades = read_trades(filename, io.StringIO(data_file_content))
-        df_corporate_actions = read_corporate_actions(filename, io.StringIO(data_file_content))
+def read_report(filename: str, fixed_point: bool = False, engine: str = "c") -> Report:
+    with FlexQueryFileIndex.from_file(filename) as sections:
+        df_statement_of_funds = read_statement_of_funds(filename, sections, fixed_point, engine)
+        df_trades = read_trades(filename, sections, engine)
+        df_corporate_actions = read_corporate_actions(filename, sections, engine)
 
         # Mix trade data into statement data and vice versa
         df_trades = df_trades.merge(df_statement_of_funds.filter(["TradeID", "AssetClass", "Conid", "Buy/Sell",
@@ -24,18 +26,38 @@ def read_report(filename: str) -> Report:
         df_statement_of_funds = df_statement_of_funds.merge(df_trades.filter(["TradeID", "Open/CloseIndicator"]),
                                                             how="left",
                                                             on="TradeID")
+        convert_fixed_point_to_decimals(df_trades)
+        convert_fixed_point_to_decimals(df_statement_of_funds)
 
         result = Report()
-        df_trades.apply(lambda row: result.process_trade(row), axis=1)
-        df_statement_of_funds.apply(lambda row: result.process_statement(row), axis=1)
-        df_corporate_actions.apply(lambda row: result.process_corporate_action(row), axis=1)
+        result.ingest_trades(df_trades)
+        result.ingest_statements(df_statement_of_funds)
+        result.ingest_corporate_actions(df_corporate_actions)
 
         return result
 
 
 def read_report2(filename: str) -> tuple[pd.DataFrame, pd.DataFrame]:
-    with open(filename, encoding="utf-8") as csv_file:
-        data_file_content = csv_file.read()
-        df_statement_of_funds = read_statement_of_funds(filename, io.StringIO(data_file_content))
-        df_trades = read_trades(filename, io.StringIO(data_file_content))
+    with FlexQueryFileIndex.from_file(filename) as sections:
+        df_statement_of_funds = read_statement_of_funds(filename, sections)
+        df_trades = read_trades(filename, sections)
         return df_statement_of_funds, df_trades
+
+
+def comparable(value):
+    """
+    Turns a report (or any part of it) into nested lists, tuples and dicts which can be compared with assertEqual,
+    treating missing values (NaN) as equal.
+    """
+    if dataclasses.is_dataclass(value):
+        return (type(value).__name__,) + tuple(comparable(getattr(value, field.name))
+                                               for field in dataclasses.fields(value))
+    if isinstance(value, dict):
+        return {key: comparable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, TransactionTable)):
+        return [comparable(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "__dict__") and not isinstance(value, type):
+        return (type(value).__name__, comparable(vars(value)))
+    return value